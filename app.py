@@ -1,28 +1,154 @@
-from flask import Flask, render_template, flash, url_for, redirect, request,session, abort
+from flask import Flask, render_template, stream_template, flash, url_for, redirect, request,session, abort, jsonify, make_response
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 from flask_migrate import Migrate
 from flask_login import UserMixin, login_user, LoginManager, login_required, logout_user, current_user
-from blog_forms import ArticleFrom, UserFrom, LoginFrom
+from blog_forms import CATEGORIES, ArticleFrom, UserFrom, LoginFrom
 from models import Article, User, db
 from functools import wraps
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.orm import undefer
+from pagination import MAX_INT, InvalidCursor, KeysetPage, decode_cursor, keyset_select, page_size
+from search import merge_index, search_articles
+from categories import adjust_counts, category_counts
+from commands import register_commands
+from page_cache import PageCache
+from conditional import as_utc, conditional, make_etag, not_modified, set_validators
+from feeds import FeedCache, build_feed, build_sitemap, build_sitemap_index, sitemap_pages
+from user_cache import user_cache
+from hashing import HasherBusy, hasher
+import db_profile
+from routing import ReadRouter, read_only
+from metrics import metrics
+from querylog import query_budget, querylog
+from assets import assets
+from compression import compress
+from jobs import jobs
+from ratelimit import limiter
+from freeze import freezer
+from template_cache import template_cache
 
 load_dotenv()
 secret_key = os.getenv("MY_KEY")
 app = Flask(__name__)
 #  Add db to the app
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///blog.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", 'sqlite:///blog.db')
 # add secret key to the app
 app.config['SECRET_KEY'] = secret_key
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# sqlite engine profile: "default" or "production" (WAL, busy_timeout, mmap...) see db_profile.py
+app.config['DB_PROFILE'] = os.getenv("DB_PROFILE", "default")
+for key in db_profile.POOL_OPTIONS:
+    if os.getenv(key):
+        app.config[key] = os.getenv(key)
+# public GET views read through a read only engine, a replica when DATABASE_READER_URL is set
+app.config['SQLALCHEMY_READER_URI'] = os.getenv("DATABASE_READER_URL")
+app.config['DB_READ_ROUTING'] = os.getenv("DB_READ_ROUTING", "1") == "1"
+# rendered page cache: memory (per worker), filesystem (shared by the workers) or null
+app.config['PAGE_CACHE_BACKEND'] = os.getenv("PAGE_CACHE_BACKEND", "memory")
+app.config['PAGE_CACHE_TTL'] = int(os.getenv("PAGE_CACHE_TTL", 300))
+# bounds of the cache (per worker for "memory", per host for "filesystem")
+app.config['PAGE_CACHE_MAX_ENTRIES'] = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", 1024))
+app.config['PAGE_CACHE_MAX_BYTES'] = int(os.getenv("PAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+if os.getenv("PAGE_CACHE_DIR"):
+    app.config['PAGE_CACHE_DIR'] = os.getenv("PAGE_CACHE_DIR")
+# password hashing: werkzeug method (and cost) + size of the hashing pool
+app.config['PASSWORD_HASH_METHOD'] = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+# per request timings, SQL counters, Server-Timing header and /metrics (prometheus)
+app.config['METRICS_ENABLED'] = os.getenv("METRICS_ENABLED", "0") == "1"
+# dev/CI: slow query log with query plans, repeated queries and @query_budget checks
+app.config['QUERY_DEBUG'] = os.getenv("QUERY_DEBUG", "0") == "1"
+app.config['SLOW_QUERY_MS'] = float(os.getenv("SLOW_QUERY_MS", 100))
+# article bodies are rendered to html when saved: "text" or "markdown" (see renderers.py)
+app.config['ARTICLE_RENDERER'] = os.getenv("ARTICLE_RENDERER", "text")
+# rows fetched per batch by the streamed full listing (/articles/all)
+app.config['LISTING_YIELD_PER'] = int(os.getenv("LISTING_YIELD_PER", 500))
+# gzip/deflate/br compression of html and other text responses
+app.config['COMPRESS_ENABLED'] = os.getenv("COMPRESS_ENABLED", "1") == "1"
+app.config['COMPRESS_LEVEL'] = int(os.getenv("COMPRESS_LEVEL", 6))
+# /sitemap.xml and /feed.atom
+app.config['FEED_TITLE'] = os.getenv("FEED_TITLE", "Jarmati Auto Ecole")
+app.config['FEED_SIZE'] = int(os.getenv("FEED_SIZE", 20))
+app.config['SITEMAP_MAX_URLS'] = int(os.getenv("SITEMAP_MAX_URLS", 50000))
+# public address of the site (https://example.com), for the absolute urls of the
+# sitemap, the feed and the frozen pages; the request's Host header when unset
+app.config['SITE_URL'] = os.getenv("SITE_URL")
+# login attempts allowed per client ip and per username ("hits/seconds"),
+# counters in memory per worker or shared through a sqlite file
+app.config['RATE_LIMIT_ENABLED'] = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+app.config['RATE_LIMIT_STORE'] = os.getenv("RATE_LIMIT_STORE")
+app.config['LOGIN_RATE_LIMIT_IP'] = os.getenv("LOGIN_RATE_LIMIT_IP", "20/60")
+app.config['LOGIN_RATE_LIMIT_USER'] = os.getenv("LOGIN_RATE_LIMIT_USER", "10/300")
+# proxies in front of the app whose X-Forwarded-For / -Proto are trusted: 1 behind
+# nginx (deploy/nginx-frozen.conf), 0 when clients connect directly (else they pick their address)
+app.config['PROXY_FIX_X_FOR'] = int(os.getenv("PROXY_FIX_X_FOR", 1))
+app.config['PROXY_FIX_X_PROTO'] = int(os.getenv("PROXY_FIX_X_PROTO", 1))
+# static export of the public pages (flask freeze), kept up to date after writes when set
+app.config['FREEZE_DIR'] = os.getenv("FREEZE_DIR")
+# background jobs after writes: worker threads, and an optional sqlite file keeping them across restarts
+app.config['JOBS_WORKERS'] = int(os.getenv("JOBS_WORKERS", 2))
+app.config['JOBS_STORE'] = os.getenv("JOBS_STORE")
+# compiled templates shared by the workers (instance/jinja unless set, "" to disable),
+# and loaded at startup instead of on the first requests
+if os.getenv("TEMPLATE_CACHE_DIR") is not None:
+    app.config['TEMPLATE_CACHE_DIR'] = os.getenv("TEMPLATE_CACHE_DIR")
+app.config['TEMPLATE_WARMUP'] = os.getenv("TEMPLATE_WARMUP", "0") == "1"
 
 #  Initialize the database
+db_profile.configure(app)
 db.init_app(app)
+db_profile.attach(app, db)
+router = ReadRouter(app, db)
 # db = SQLAlchemy(app)
 
 # migration instance
 migrate = Migrate(app,db)
 
+# public pages cache
+page_cache = PageCache(app)
+
+# logged in users snapshots (see user_cache.py)
+user_cache.init_app(app)
+
+# bounded password hashing pool (see hashing.py)
+hasher.init_app(app)
+
+# request metrics (see metrics.py)
+metrics.init_app(app)
+
+# query checks for development and CI (see querylog.py)
+querylog.init_app(app)
+
+# fingerprinted static files built by `flask assets build` (see assets.py)
+assets.init_app(app)
+
+# dynamic compression, streamed responses included (see compression.py)
+compress.init_app(app)
+
+# background jobs (see jobs.py)
+jobs.init_app(app)
+
+# login throttling (see ratelimit.py)
+limiter.init_app(app)
+
+# the client address behind the reverse proxy: request.remote_addr keys the login limits
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'], x_proto=app.config['PROXY_FIX_X_PROTO'])
+
+# static export, flask freeze (see freeze.py)
+freezer.init_app(app)
+
+# jinja bytecode cache (see template_cache.py)
+template_cache.init_app(app)
+
+# sitemap / feed bytes, rebuilt when the articles change (see feeds.py)
+feed_cache = FeedCache()
+
+# flask cli commands (flask search rebuild, ...)
+register_commands(app)
+
 # Login:
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -30,7 +156,23 @@ login_manager.login_view = 'login'
 
 @login_manager.user_loader
 def user_loader(user_id):
-    return User.query.get(int(user_id))
+    # read only snapshot, evicted on add/update/delete of the user
+    return user_cache.load(int(user_id))
+
+
+# TEMPLATE_WARMUP: compile (or load from the bytecode cache) every template now
+template_cache.warm_up()
+
+
+# ################################ Background jobs: ################################
+
+
+@jobs.task('search.merge', delay=5)
+def merge_search_index():
+    # every article write leaves small FTS segments behind: merge them once
+    # the edits settle (coalesced, so a burst of saves runs it once)
+    with db.engine.begin() as connection:
+        merge_index(connection)
 
 
 
@@ -49,25 +191,164 @@ def admin_required(f):
 
 # ################################ Public routes: ################################
 
+
+# validators for conditional GET: one small query instead of the full page
+def articles_state():
+    # max(updated_at) catches additions and edits, the count catches deletions
+    last_modified, count = db.session.query(func.max(Article.updated_at), func.count(Article.id)).one()
+    return (last_modified, count), last_modified
+
+
+def article_state(id):
+    row = db.session.query(Article.updated_at).filter(Article.id == id).first()
+    if row is None:
+        return None
+    return row.updated_at, row.updated_at
+
+
 @app.route("/")
+@query_budget(1)
+@read_only
+@page_cache.cached("index")
 def index():
     return render_template("index.html")
 
 
 @app.route("/articles")
+@query_budget(4)
+@read_only
+@conditional(articles_state)
+@page_cache.cached("articles", query_args=('after', 'before', 'per_page', 'category'))
 def articles():
-    articles = db.session.query(Article).order_by(Article.created_at).all()
-    return render_template("articles.html", articles=articles)
+    # keyset pagination on (created_at, id): ?after=<cursor> / ?before=<cursor> & ?per_page=
+    per_page = page_size(request.args.get('per_page'))
+    try:
+        after = request.args.get('after')
+        before = request.args.get('before')
+        after = decode_cursor(after, (datetime, int)) if after else None
+        before = decode_cursor(before, (datetime, int)) if before else None
+    except InvalidCursor:
+        abort(400)
+    # ?category= filter, served by the (category, created_at) index
+    category = request.args.get('category') or None
+    if category is not None and category not in CATEGORIES:
+        abort(400)
+    # only the columns the listing shows, as plain rows (no ORM objects, no content)
+    stmt = select(Article.id, Article.title, Article.extrait, Article.created_at)
+    if category is not None:
+        stmt = stmt.where(Article.category == category)
+    stmt = keyset_select(stmt, (Article.created_at, Article.id), per_page, after=after, before=before)
+    page = KeysetPage(db.session.execute(stmt), lambda a: (a.created_at, a.id), per_page, after=after, before=before)
+    return render_template("articles.html", articles=page, page=page, category=category,
+                           categories=category_counts(db.session))
+
+def buffered(chunks, size=16384):
+    # jinja yields a few bytes at a time: group them into fewer, larger writes
+    buffer, length = [], 0
+    try:
+        for chunk in chunks:
+            buffer.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                yield ''.join(buffer)
+                buffer, length = [], 0
+        if buffer:
+            yield ''.join(buffer)
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+@app.route("/articles/all")
+@query_budget(2)
+@read_only
+@login_required
+def all_articles():
+    # the whole listing, streamed: rows are fetched LISTING_YIELD_PER at a time
+    # while the template is rendered and sent, nothing holds the full list
+    stmt = select(Article.id, Article.title, Article.extrait, Article.created_at)
+    stmt = stmt.order_by(Article.created_at, Article.id)
+    rows = db.session.execute(stmt.execution_options(yield_per=app.config['LISTING_YIELD_PER']))
+    return app.response_class(buffered(stream_template("articles.html", articles=rows, page=None)), mimetype='text/html')
 
 @app.route("/articles/<int:id>")
+@query_budget(3)
+@read_only
+@conditional(article_state)
+@page_cache.cached(lambda id: f"article:{id}")
 def article(id):
-    article = db.session.query(Article).get_or_404(id)
+    # the pre-rendered body, the source is only loaded for rows not rendered yet
+    article = db.session.query(Article).options(undefer(Article.content_html)).get_or_404(id)
     return render_template("article.html", article=article)
 
 
+@app.route("/search")
+@query_budget(2)
+@read_only
+def search():
+    q = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = page_size(request.args.get('per_page'))
+    # the OFFSET must fit in a sqlite INTEGER
+    page = min(max(page, 1), MAX_INT // per_page)
+    results, has_next = search_articles(db.session, q, page=page, per_page=per_page)
+    return render_template("search.html", q=q, results=results, page=page, per_page=per_page, has_next=has_next)
+
+
+# crawlers and feed readers: built once per version of the articles, 304 until it changes
+def xml_response(name, build, mimetype):
+    version, last_modified = articles_state()
+    count = version[1]
+    last_modified = as_utc(last_modified)
+    base_url = app.config['SITE_URL'] or request.host_url
+    etag = make_etag(version, name, base_url)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+    data = feed_cache.get((name, base_url), version, lambda: build(count, last_modified, base_url))
+    return set_validators(app.response_class(data, mimetype=mimetype), etag, last_modified)
+
+
+@app.route("/sitemap.xml")
+@query_budget(3)
+@read_only
+def sitemap():
+    max_urls = app.config['SITEMAP_MAX_URLS']
+
+    def build(count, last_modified, base_url):
+        pages = sitemap_pages(count, max_urls)
+        if pages == 1:
+            return build_sitemap(db.session, 1, max_urls, base_url)
+        return build_sitemap_index(pages, last_modified, base_url)
+    return xml_response("sitemap", build, 'application/xml')
+
+
+@app.route("/sitemap-<int:page>.xml")
+@query_budget(3)
+@read_only
+def sitemap_page(page):
+    max_urls = app.config['SITEMAP_MAX_URLS']
+
+    def build(count, last_modified, base_url):
+        if not 1 <= page <= sitemap_pages(count, max_urls):
+            abort(404)
+        return build_sitemap(db.session, page, max_urls, base_url)
+    return xml_response(f"sitemap-{page}", build, 'application/xml')
+
+
+@app.route("/feed.atom")
+@query_budget(3)
+@read_only
+def feed():
+    def build(count, last_modified, base_url):
+        return build_feed(db.session, app.config['FEED_TITLE'], app.config['FEED_SIZE'], base_url)
+    return xml_response("feed", build, 'application/atom+xml')
+
+
 # ################################ Article routes: ################################
 
 @app.route("/add_article", methods=['GET', 'POST'])
+@query_budget(5)
 @login_required
 def add_article():
     form = ArticleFrom()
@@ -82,8 +363,16 @@ def add_article():
             extrait = form.extrait.data,
             category = form.category.data
             )
+            article.render_content()
             db.session.add(article)
+            # insert now: the new id is needed once committed (no reload)
+            db.session.flush()
+            article_id = article.id
+            adjust_counts(db.session, {article.category: 1})
             db.session.commit()
+            page_cache.invalidate("articles")
+            jobs.enqueue('search.merge')
+            freezer.page_changed(article_id)
             flash(f'Article - {form.title.data} - ajoutee avec succee!', 'success')
             return redirect(url_for('articles'))
         else:
@@ -92,24 +381,36 @@ def add_article():
 
 
 @app.route("/edit_article/<int:id>", methods=['GET', 'POST'])
+@query_budget(8)
 @login_required
 def edit_article(id):
     form = ArticleFrom()
-    article_to_edit = Article.query.get_or_404(id)
-    duplicate = Article.query.filter(Article.id != article_to_edit.id, Article.title==request.form.get('title'),).first()
+    article_to_edit = Article.query.options(undefer(Article.content)).get_or_404(id)
     if request.method == "POST":
+        # the raw form is used below: an unknown category would add a row to the counts
+        if request.form.get('category') not in CATEGORIES:
+            flash("Categorie inconnue, essayez a nouveau!", 'message')
+            return redirect(url_for('edit_article', id =id))
+        duplicate = Article.query.filter(Article.id != article_to_edit.id, Article.title==request.form.get('title'),).first()
+        old_category = article_to_edit.category
         article_to_edit.title = request.form.get('title')
         article_to_edit.slug = request.form.get('slug')
         article_to_edit.content = request.form.get('content')
         article_to_edit.extrait = request.form.get('extrait')
         article_to_edit.category = request.form.get('category')
+        article_to_edit.render_content()
         
         if duplicate:
             flash("Titre de l'article deja existe, essayez a nouveau!", 'message')
             return redirect(url_for('edit_article', id =id))
         else:
             try:
+                if article_to_edit.category != old_category:
+                    adjust_counts(db.session, {old_category: -1, article_to_edit.category: 1})
                 db.session.commit()
+                page_cache.invalidate("articles", f"article:{id}")
+                jobs.enqueue('search.merge')
+                freezer.page_changed(id)
                 flash(f"Article - {article_to_edit.title} - modifiee avec succee", "success")
                 return redirect(url_for('articles'))
             except:
@@ -119,12 +420,17 @@ def edit_article(id):
 
 
 @app.route("/delete_article/<int:id>")
+@query_budget(5)
 @login_required
 def delete_article(id):
     article_to_delete = Article.query.get_or_404(id)
     try:
         db.session.delete(article_to_delete)
+        adjust_counts(db.session, {article_to_delete.category: -1})
         db.session.commit()
+        page_cache.invalidate("articles", f"article:{id}")
+        jobs.enqueue('search.merge')
+        freezer.page_changed(id)
         flash("Article suprime avec succes.", "success")
         # return render_template("articles.html",
         #                        articles=articles)
@@ -140,22 +446,61 @@ def delete_article(id):
 
 
 
+def prefix_range(column, prefix):
+    # `column LIKE 'p%'` can't use the index (LIKE is case insensitive in sqlite),
+    # the equivalent range can: p <= column < p with its last character bumped,
+    # so the search is case sensitive, as the usernames
+    for i in reversed(range(len(prefix))):
+        code = ord(prefix[i])
+        if code < 0x10FFFF:
+            # the surrogates are not characters, U+E000 comes right after U+D7FF
+            bumped = chr(0xE000 if code == 0xD7FF else code + 1)
+            return (column >= prefix) & (column < prefix[:i] + bumped)
+        # U+10FFFF can't be bumped: drop it and bump the character before
+    # nothing sorts after U+10FFFF..., every greater string starts with it
+    return column >= prefix
+
+
+def user_list_page():
+    # keyset pagination on (created_at, id), ?q= username prefix, ?after= / ?before= & ?per_page=
+    per_page = page_size(request.args.get('per_page'))
+    try:
+        after = request.args.get('after')
+        before = request.args.get('before')
+        after = decode_cursor(after, (datetime, int)) if after else None
+        before = decode_cursor(before, (datetime, int)) if before else None
+    except InvalidCursor:
+        abort(400)
+    q = request.args.get('q', '').strip()
+    # only the displayed columns, never password_hash
+    stmt = select(User.id, User.full_name, User.username, User.created_at)
+    if q:
+        stmt = stmt.where(prefix_range(User.username, q))
+    stmt = keyset_select(stmt, (User.created_at, User.id), per_page, after=after, before=before)
+    page = KeysetPage(db.session.execute(stmt), lambda u: (u.created_at, u.id), per_page, after=after, before=before)
+    return page, q
+
+
 @app.route("/add_user", methods=['GET', 'POST'])
+@query_budget(3)
 @admin_required
 @login_required
 def add_user():
     form = UserFrom()
-    # user_list = db.session.query(User).order_by(User.created_at).all()
-    user_list = User.query.order_by(User.created_at).all()
     if form.validate_on_submit():
-        user_exit = User.query.filter_by(username=form.username.data).first()
+        user_exit = db.session.query(User.id).filter_by(username=form.username.data).first()
         if user_exit is None:
-            # using password insted of password_hash so the password is hashed automaticly
-            user_to_add = User(username = form.username.data,
-                               password = form.password_hash.data,
-                               full_name = form.full_name.data,
-                               is_admin = form.is_admin.data
-                               )
+            try:
+                # using password insted of password_hash so the password is hashed automaticly
+                user_to_add = User(username = form.username.data,
+                                   password = form.password_hash.data,
+                                   full_name = form.full_name.data,
+                                   is_admin = form.is_admin.data
+                                   )
+            except HasherBusy:
+                flash("Serveur occupe, esseyez a nouveau dans un instant.")
+                user_list, q = user_list_page()
+                return render_template("add_user.html", form=form, user_list=user_list, q=q), 503, {'Retry-After': '1'}
             db.session.add(user_to_add)
             db.session.commit()
             flash("Utilisateur ajoute avec succes")
@@ -167,27 +512,23 @@ def add_user():
     form.full_name.data = ''
     form.password_hash.data = ''
     form.password_hash2.data = ''
+    # the list is only queried when the page is rendered, not before a redirect
+    user_list, q = user_list_page()
     return render_template("add_user.html",
                            form=form,
-                           user_list = user_list)
+                           user_list = user_list,
+                           q=q)
 
 
 @app.route("/delete_user/<int:id>")
+@query_budget(3)
 # @login_required
 def delete_user(id):
-    form = UserFrom()
-    user_list = User.query.order_by(User.created_at)
     user_to_delete = User.query.get_or_404(id)
     try:
         db.session.delete(user_to_delete)
         db.session.commit()
         flash("Utilisateur suprime avec succes",)
-        form.username.data = ''
-        form.full_name.data = ''
-        form.password_hash.data = ''
-        # return render_template("add_user.html",
-        #                        user_list=user_list,
-        #                        form=form)
         return redirect(url_for('add_user'))
     except:
         flash("Oups! Esseyez a nouveau!")
@@ -198,10 +539,21 @@ def delete_user(id):
 
 
 @app.route("/login", methods=['GET', 'POST'])
+@query_budget(3)
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
 
+    if request.method == 'POST':
+        # before any query or password hash: credential stuffing is cut off here
+        username = request.form.get('username', '').strip().lower()[:200]
+        retry_after = limiter.hit(
+            (f"ip:{request.remote_addr}", app.config['LOGIN_RATE_LIMIT_IP']),
+            (f"user:{username}" if username else None, app.config['LOGIN_RATE_LIMIT_USER']),
+        )
+        if retry_after:
+            abort(429, retry_after=retry_after)
+
     form = LoginFrom()
     if form.validate_on_submit():
         username = form.username.data
@@ -209,7 +561,20 @@ def login():
         
         user_to_check = User.query.filter_by(username=username).first()
         if user_to_check:
-            if user_to_check.verify_password(password_hash):
+            try:
+                password_ok = user_to_check.verify_password(password_hash)
+            except HasherBusy:
+                # every hashing slot is taken: fail fast instead of queueing
+                flash("Serveur occupe, esseyez a nouveau dans un instant.", "error")
+                return render_template("login.html", form = form), 503, {'Retry-After': '1'}
+            if password_ok:
+                if user_to_check.needs_rehash():
+                    # the hash method or cost changed since this password was stored
+                    try:
+                        user_to_check.password = password_hash
+                        db.session.commit()
+                    except HasherBusy:
+                        pass
                 login_user(user_to_check)
                 flash('Utilisateur connecte avec succee!', "success")
                 return redirect(url_for('articles'))
@@ -229,6 +594,19 @@ def logout():
     return redirect(url_for('index'))
 
 
+@app.route("/cache_stats")
+@admin_required
+def cache_stats():
+    return jsonify(page_cache.stats())
+
+
+@app.route("/job_stats")
+@admin_required
+def job_stats():
+    # queue depth, wait / run latencies and counters of the background jobs
+    return jsonify(jobs.stats())
+
+
 @app.route("/admin_dash/<username>")
 def admin_dash(username):
     return render_template("admin.html", username=username)
@@ -246,6 +624,12 @@ def not_found(e):
 def not_found(e):
     return render_template("404.html"), 404
 
+# Too many requests (login throttling)
+@app.errorhandler(429)
+def too_many_requests(e):
+    headers = [(name, value) for name, value in e.get_headers() if name == 'Retry-After']
+    return render_template("429.html", retry_after=getattr(e, 'retry_after', None)), 429, headers
+
 # Internal server error
 @app.errorhandler(500)
 def not_found(e):
@@ -0,0 +1,204 @@
+import os
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import abort, render_template, request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import undefer
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie
+
+import db_profile
+from app import app, db
+from blog_forms import CATEGORIES
+from categories import COUNTS_QUERY
+from conditional import as_utc, make_etag, not_modified, set_validators
+from models import Article
+from pagination import InvalidCursor, KeysetPage, decode_cursor, keyset_select, page_size
+
+
+# ASGI entry point (uvicorn asgi:application; needs aiosqlite, asgiref and uvicorn).
+#
+# Anonymous GET / HEAD requests for index, articles and article are served
+# by the coroutines below, reading through SQLAlchemy's asyncio extension
+# (aiosqlite, a read only connection to the same file): a slow client or a
+# slow query waits on the event loop instead of holding one of the
+# server's threads. They render the same templates and send the same
+# ETag / Last-Modified as the WSGI views, and go through the app's
+# before / after request hooks (metrics, compression).
+#
+# A request carrying the session or remember-me cookie (logged in users,
+# pending flash messages) and every other route, admin included, goes to
+# the unchanged Flask app through asgiref's WsgiToAsgi.
+
+ASYNC_ENDPOINTS = ('index', 'articles', 'article')
+
+
+def async_url(url):
+    """The aiosqlite, read only twin of the app's sqlite url."""
+    if url.get_backend_name() != 'sqlite':
+        raise RuntimeError(f"The async views only support sqlite, not {url.get_backend_name()}")
+    if url.database in (None, '', ':memory:'):
+        return url.set(drivername='sqlite+aiosqlite')
+    path = os.path.abspath(url.database)
+    return url.set(drivername='sqlite+aiosqlite', database=f"file:{path}", query={'mode': 'ro', 'uri': 'true'})
+
+
+class AsyncViews:
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WsgiToAsgi(app)
+        self.engine = None
+        self.sessions = None
+        self.cookies = {app.config.get('SESSION_COOKIE_NAME', 'session'),
+                        app.config.get('REMEMBER_COOKIE_NAME', 'remember_token')}
+
+    # ################################ lifecycle: ################################
+
+    def start(self):
+        if self.engine is not None:
+            return
+        with self.app.app_context():
+            url = db.engine.url
+        self.engine = create_async_engine(async_url(url))
+        db_profile.apply_pragmas(self.engine.sync_engine, db_profile.pragmas_for(self.app.config), read_only=True)
+        self.sessions = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def stop(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # ################################ dispatch: ################################
+
+    def _is_anonymous(self, scope):
+        # werkzeug's parser, as Flask: SimpleCookie drops the whole header on one
+        # unquoted value ({"a":1}) and would let a logged in user through
+        cookie = '; '.join(v.decode('latin-1') for k, v in scope['headers'] if k == b'cookie')
+        return not cookie or not self.cookies.intersection(parse_cookie(cookie))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            headers = dict(scope['headers'])
+            if self._is_anonymous(scope):
+                try:
+                    endpoint, values = self.app.url_map.bind('').match(scope['path'], 'GET')
+                except Exception:
+                    endpoint = None
+                if endpoint in ASYNC_ENDPOINTS:
+                    self.start()
+                    return await self.respond(scope, send, headers, endpoint, values)
+        return await self.wsgi(scope, receive, send)
+
+    async def respond(self, scope, send, headers, endpoint, values):
+        host = headers.get(b'host', b'localhost').decode('latin-1')
+        environ_headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in headers.items() if k != b'cookie'}
+        async with self.sessions() as session:
+            with self.app.test_request_context(
+                scope['path'], method=scope['method'], query_string=scope.get('query_string', b'').decode('latin-1'),
+                base_url=f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}",
+                headers=environ_headers,
+            ):
+                response = self.app.preprocess_request()
+                if response is None:
+                    try:
+                        response = await getattr(self, endpoint)(session, **values)
+                    except HTTPException as e:
+                        # the app's error handlers (404.html...)
+                        response = self.app.handle_user_exception(e)
+                    except Exception as e:
+                        # as Flask.full_dispatch_request: logged, 500 handler, got_request_exception
+                        response = self.app.handle_exception(e)
+                response = self.app.process_response(self.app.make_response(response))
+                await self.send(send, response, head=scope['method'] == 'HEAD')
+
+    async def send(self, send, response, head=False):
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()],
+        })
+        if head:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        for chunk in response.iter_encoded():
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+        response.close()
+
+    # ################################ views: ################################
+
+    def _conditional(self, version, last_modified):
+        # same etag as the WSGI views for an anonymous visitor (see conditional.py)
+        last_modified = as_utc(last_modified)
+        etag = make_etag(version, False, request.full_path)
+        return etag, last_modified, not_modified(etag, last_modified)
+
+    async def index(self, session):
+        return self.app.response_class(render_template("index.html"))
+
+    async def articles(self, session):
+        per_page = page_size(request.args.get('per_page'))
+        try:
+            after = request.args.get('after')
+            before = request.args.get('before')
+            after = decode_cursor(after, (datetime, int)) if after else None
+            before = decode_cursor(before, (datetime, int)) if before else None
+        except InvalidCursor:
+            abort(400)
+        category = request.args.get('category') or None
+        if category is not None and category not in CATEGORIES:
+            abort(400)
+
+        last_modified, count = (await session.execute(
+            select(func.max(Article.updated_at), func.count(Article.id)))).one()
+        etag, last_modified, not_modified = self._conditional((last_modified, count), last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        stmt = select(Article.id, Article.title, Article.extrait, Article.created_at)
+        if category is not None:
+            stmt = stmt.where(Article.category == category)
+        stmt = keyset_select(stmt, (Article.created_at, Article.id), per_page, after=after, before=before)
+        rows = (await session.execute(stmt)).all()
+        page = KeysetPage(rows, lambda a: (a.created_at, a.id), per_page, after=after, before=before)
+        categories = (await session.execute(COUNTS_QUERY)).all()
+        response = self.app.response_class(render_template(
+            "articles.html", articles=page, page=page, category=category, categories=categories))
+        return set_validators(response, etag, last_modified)
+
+    async def article(self, session, id):
+        updated_at = (await session.execute(select(Article.updated_at).where(Article.id == id))).scalar()
+        if updated_at is None:
+            abort(404)
+        etag, last_modified, not_modified = self._conditional(updated_at, updated_at)
+        if not_modified is not None:
+            return not_modified
+
+        article = (await session.execute(
+            select(Article).options(undefer(Article.content_html)).where(Article.id == id))).scalar()
+        if article is None:
+            abort(404)
+        if not article.content_html:
+            # not rendered yet: the template falls back to the source
+            await session.refresh(article, ['content'])
+        response = self.app.response_class(render_template("article.html", article=article))
+        return set_validators(response, etag, last_modified)
+
+
+application = AsyncViews(app)
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional, .br variants are skipped without it
+    brotli = None
+
+
+# Fingerprinted static assets.
+#
+# `flask assets build` copies every file of static/ to static/dist/ under a
+# content hashed name (css/style.3f2a91c0de.css), next to precompressed .gz
+# (and .br) variants for text files, and writes dist/manifest.json.
+# url_for('static', filename='css/style.css') then resolves to the hashed
+# name and the static view serves it with a year long immutable
+# Cache-Control, picking the precompressed file the client accepts.
+# Without a manifest everything works as before.
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.txt', '.json', '.xml', '.html', '.map'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)(?!data:|https?:|//|/)([^'")]+)\1\s*\)''')
+
+
+def _hashed_name(path, data):
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _rewrite_css(path, data, manifest):
+    # point url(...) references of a stylesheet at the hashed files
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        quote, ref = match.groups()
+        clean = ref.split('?')[0].split('#')[0]
+        target = posixpath.normpath(posixpath.join(base, clean))
+        if target not in manifest:
+            return match.group(0)
+        hashed = posixpath.relpath(manifest[target], posixpath.join(DIST, base))
+        return f"url({quote}{hashed}{ref[len(clean):]}{quote})"
+
+    return _CSS_URL.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+def build(static_folder, brotli_variants=True, level=9):
+    """Write the hashed and precompressed copies, returns the manifest."""
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [d for d in dirs if d != DIST]
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+            sources.append(path)
+    # stylesheets last: their url(...) need the other hashed names
+    sources.sort(key=lambda p: (p.endswith('.css'), p))
+
+    manifest = {}
+    for path in sources:
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            data = f.read()
+        if path.endswith('.css'):
+            data = _rewrite_css(path, data, manifest)
+        hashed = posixpath.join(DIST, _hashed_name(path, data))
+        target = os.path.join(static_folder, hashed)
+        _write(target, data)
+        if posixpath.splitext(path)[1].lower() in COMPRESSIBLE:
+            _write(target + '.gz', gzip.compress(data, compresslevel=level, mtime=0))
+            if brotli is not None and brotli_variants:
+                _write(target + '.br', brotli.compress(data))
+        manifest[path] = hashed
+
+    _write(os.path.join(static_folder, DIST, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+class Assets:
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_MANIFEST', True)
+        app.extensions['assets'] = self
+        self.load(app)
+        app.url_defaults(self._hashed_url)
+        app.view_functions['static'] = self.send_static
+
+    def load(self, app):
+        path = os.path.join(app.static_folder, DIST, MANIFEST)
+        self.manifest = {}
+        if app.config['ASSETS_MANIFEST'] and os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == 'static' and self.manifest:
+            filename = values.get('filename')
+            if filename in self.manifest:
+                values['filename'] = self.manifest[filename]
+
+    def send_static(self, filename):
+        if not filename.startswith(DIST + '/'):
+            return current_app.send_static_file(filename)
+
+        static_folder = current_app.static_folder
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+                response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype, max_age=31536000)
+                response.content_encoding = encoding
+                break
+        else:
+            response = send_from_directory(static_folder, filename, max_age=31536000)
+        response.vary.add('Accept-Encoding')
+        # the name changes with the content: never revalidate
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+
+assets = Assets()
@@ -0,0 +1,179 @@
+"""Public pages under many slow clients: WSGI thread pool vs the ASGI entry point.
+
+    pip install aiosqlite asgiref uvicorn
+    python benchmarks/asgi_vs_wsgi.py --articles 2000 --slow 200 --fast 8 --threads 16 --duration 10
+
+Each server runs in its own process on the same seeded database:
+- wsgi: the Flask app behind a WSGI server with a fixed pool of --threads
+  request threads (what gunicorn gthread / sync workers give per process),
+- asgi: `uvicorn asgi:application`, one process.
+
+--slow clients trickle their request headers (one header every --delay
+seconds) and read the response in small pieces, like phones on a bad
+network; --fast clients request anonymous article pages back to back.
+Reported: fast requests per second and their latency, slow requests
+completed. A slow client holds a WSGI thread for its whole request, so once
+there are more of them than threads the fast ones queue behind them; on the
+event loop they only hold a socket.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import common
+
+HEADERS = ["User-Agent: slow-client", "Accept: text/html", "Accept-Language: fr", "Accept-Encoding: gzip",
+           "Cache-Control: no-cache"]
+
+
+def serve_wsgi(port, threads):
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledServer(WSGIServer):
+        # a fixed number of request threads, the accept loop hands them connections
+        request_queue_size = 1024
+        pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._process, request, client_address)
+
+        def _process(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    make_server('127.0.0.1', port, app, server_class=PooledServer, handler_class=QuietHandler).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def request(port, path, delay=0, read_size=65536):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n".encode())
+        for header in HEADERS:
+            if delay:
+                await writer.drain()
+                await asyncio.sleep(delay)
+            writer.write(f"{header}\r\n".encode())
+        writer.write(b"Connection: close\r\n\r\n")
+        await writer.drain()
+        status = (await reader.readline()).split(b' ')[1]
+        while await reader.read(read_size):
+            if delay:
+                await asyncio.sleep(delay / 10)
+        return int(status)
+    finally:
+        writer.close()
+
+
+async def load(port, args, ids):
+    stop = time.perf_counter() + args.duration
+    latencies, slow_done, errors = [], [0], [0]
+
+    async def slow():
+        while time.perf_counter() < stop:
+            try:
+                await request(port, f"/articles/{random.choice(ids)}", delay=args.delay, read_size=1024)
+                slow_done[0] += 1
+            except (OSError, ValueError, IndexError):
+                errors[0] += 1
+
+    async def fast():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                status = await request(port, f"/articles/{random.choice(ids)}")
+            except (OSError, ValueError, IndexError):
+                errors[0] += 1
+                continue
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors[0] += 1
+
+    await asyncio.gather(*[slow() for _ in range(args.slow)], *[fast() for _ in range(args.fast)])
+    return latencies, slow_done[0], errors[0]
+
+
+def run(name, command, port, args, ids, env):
+    server = subprocess.Popen(command, env=env, cwd=common.ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        latencies, slow_done, errors = asyncio.run(load(port, args, ids))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    if not latencies:
+        print(f"{name:>5}: no fast request completed, {slow_done} slow, {errors} errors")
+        return
+    print(f"{name:>5}: {len(latencies) / args.duration:8.1f} fast req/s,"
+          f" p50 {common.fmt_ms(latencies[len(latencies) // 2])},"
+          f" p99 {common.fmt_ms(latencies[max(int(len(latencies) * 0.99) - 1, 0)])},"
+          f" {slow_done} slow requests done, {errors} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--slow', type=int, default=200)
+    parser.add_argument('--fast', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=0.2)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--serve-wsgi', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_wsgi:
+        serve_wsgi(args.serve_wsgi, args.threads)
+        return
+
+    path, engine = common.temp_database("asgi.db")
+    common.seed_articles(engine, args.articles)
+    ids = [id for id, in engine.connect().exec_driver_sql("SELECT id FROM article")]
+    engine.dispose()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", MY_KEY=os.environ.get('MY_KEY', 'benchmark'))
+
+    print(f"{args.articles} articles, {args.slow} slow clients ({len(HEADERS)} headers, one per {args.delay}s),"
+          f" {args.fast} fast clients, {args.duration}s each")
+    port = free_port()
+    run("wsgi", [sys.executable, os.path.abspath(__file__), '--serve-wsgi', str(port), '--threads', str(args.threads)],
+        port, args, ids, env)
+    port = free_port()
+    run("asgi", [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port), '--no-access-log'],
+        port, args, ids, env)
+
+
+if __name__ == '__main__':
+    main()
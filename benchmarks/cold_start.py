@@ -0,0 +1,90 @@
+"""Time to first response of a fresh worker, per route, with and without the template bytecode cache.
+
+    python benchmarks/cold_start.py --articles 500 --repeat 5
+
+Every measure runs in a new python process (like a new gunicorn worker after
+a deploy): import of the app, then the first request of one route through
+the test client, then a second one. Modes:
+- nocache: TEMPLATE_CACHE_DIR="", templates compiled on first use,
+- bytecode: cache filled beforehand by `flask templates compile`,
+- warmup: bytecode cache + TEMPLATE_WARMUP=1, templates loaded at import.
+Reported (median of --repeat): the import, the first request, their sum
+(time to first response) and the second request, for reference.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+
+ROUTES = ['/', '/articles', '/articles/1', '/search?q=route', '/login']
+MODES = ['nocache', 'bytecode', 'warmup']
+
+
+def child(route):
+    start = time.perf_counter()
+    from app import app
+    imported = time.perf_counter()
+    client = app.test_client()
+    response = client.get(route)
+    first = time.perf_counter()
+    assert response.status_code == 200, (route, response.status_code)
+    client.get(route)
+    second = time.perf_counter()
+    print(json.dumps({'import': imported - start, 'first': first - imported, 'second': second - first}))
+
+
+def compile_templates():
+    from template_cache import template_cache
+    from app import app  # noqa: F401
+    template_cache.compile(clean=True)
+
+
+def run(args, env):
+    return subprocess.run([sys.executable, os.path.abspath(__file__)] + args, env=env, cwd=common.ROOT,
+                          check=True, capture_output=True, text=True).stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--compile', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child)
+    if args.compile:
+        return compile_templates()
+
+    path, engine = common.temp_database("cold.db")
+    common.seed_articles(engine, args.articles)
+    engine.dispose()
+    cache_dir = tempfile.mkdtemp(prefix="blog-bench-jinja-")
+    base = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", MY_KEY=os.environ.get('MY_KEY', 'benchmark'),
+                PAGE_CACHE_BACKEND='null', TEMPLATE_CACHE_DIR=cache_dir, TEMPLATE_WARMUP='0')
+    run(['--compile'], base)
+    envs = {
+        'nocache': dict(base, TEMPLATE_CACHE_DIR=''),
+        'bytecode': base,
+        'warmup': dict(base, TEMPLATE_WARMUP='1'),
+    }
+
+    print(f"{args.articles} articles, median of {args.repeat} fresh processes per route and mode")
+    print(f"{'route':<18} {'mode':<9} {'import':>11} {'1st request':>11} {'total':>11} {'2nd request':>11}")
+    for route in ROUTES:
+        for mode in MODES:
+            samples = [json.loads(run(['--child', route], envs[mode])) for _ in range(args.repeat)]
+            median = {key: sorted(s[key] for s in samples)[len(samples) // 2] for key in samples[0]}
+            total = sorted(s['import'] + s['first'] for s in samples)[len(samples) // 2]
+            print(f"{route:<18} {mode:<9} {common.fmt_ms(median['import'])} {common.fmt_ms(median['first'])}"
+                  f" {common.fmt_ms(total)} {common.fmt_ms(median['second'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import time
+
+# benchmarks are run as scripts: python benchmarks/<name>.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from models import db  # noqa: E402
+from seed import seed, synthetic_articles  # noqa: E402,F401
+
+
+def temp_database(name):
+    path = os.path.join(tempfile.mkdtemp(prefix="blog-bench-"), name)
+    return path, create_engine(f"sqlite:///{path}")
+
+
+def seed_articles(engine, n, chunk=5000, content_words=300):
+    db.metadata.create_all(engine)
+    seed(engine, articles=n, chunk=chunk, content_words=content_words)
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings
+
+
+def fmt_ms(seconds):
+    return f"{seconds * 1000:8.2f} ms"
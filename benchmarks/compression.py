@@ -0,0 +1,60 @@
+"""Dynamic compression of the listing page: bytes on the wire and CPU per request.
+
+    python benchmarks/compression.py --articles 2000 --per-page 100 --level 6
+"""
+import argparse
+import os
+import time
+
+from common import seed_articles, temp_database
+
+os.environ.setdefault('MY_KEY', 'bench')
+
+
+def measure(client, url, accept_encoding, repeat):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    cpu, size, encoding = [], 0, None
+    for _ in range(repeat):
+        start = time.process_time()
+        response = client.get(url, headers=headers)
+        cpu.append(time.process_time() - start)
+        size = len(response.data)
+        encoding = response.headers.get('Content-Encoding', 'identity')
+    cpu.sort()
+    return cpu[len(cpu) // 2], size, encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--level', type=int, action='append',
+                        help="gzip/deflate level (repeatable), default 1, 6 and 9")
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    path, engine = temp_database("compression.db")
+    print(f"seeding {args.articles} articles in {path} ...")
+    seed_articles(engine, args.articles, content_words=50)
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    os.environ['PAGE_CACHE_BACKEND'] = 'null'  # measure the render, not the cache
+    from app import app
+
+    client = app.test_client()
+    url = f"/articles?per_page={args.per_page}"
+    compress = app.extensions['compress']
+
+    base_cpu, base_size, _ = measure(client, url, None, args.repeat)
+    print(f"{url}  identity: {base_size:8d} bytes  cpu p50 {base_cpu * 1000:7.2f} ms")
+    for level in args.level or [1, 6, 9]:
+        app.config['COMPRESS_LEVEL'] = level
+        app.config['COMPRESS_BR_LEVEL'] = min(level, 11)
+        for accept in compress.encodings():
+            cpu, size, encoding = measure(client, url, accept, args.repeat)
+            print(f"  level {level} {encoding:>8}: {size:8d} bytes ({size / base_size:6.1%})"
+                  f"  cpu p50 {cpu * 1000:7.2f} ms (+{(cpu - base_cpu) * 1000:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Listing read path: full ORM objects vs deferred body vs column projection.
+
+    python benchmarks/listing_projection.py --articles 20000 --content-words 3000 --rows 1000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from common import fmt_ms, seed_articles, temp_database
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, undefer
+
+from models import Article
+
+
+def measure(engine, build, rows, repeat):
+    timings, peaks = [], []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = build(session, rows)
+            # touch what the template touches
+            for row in result:
+                row.id, row.title, row.extrait, row.created_at
+            timings.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], max(peaks)
+
+
+def full_objects(session, rows):
+    stmt = select(Article).options(undefer(Article.content)).order_by(Article.created_at, Article.id).limit(rows)
+    return session.scalars(stmt).all()
+
+
+def deferred_objects(session, rows):
+    stmt = select(Article).order_by(Article.created_at, Article.id).limit(rows)
+    return session.scalars(stmt).all()
+
+
+def projection(session, rows):
+    stmt = select(Article.id, Article.title, Article.extrait, Article.created_at).order_by(Article.created_at, Article.id).limit(rows)
+    return session.execute(stmt).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=20000)
+    parser.add_argument('--content-words', type=int, default=3000)
+    parser.add_argument('--rows', type=int, action='append',
+                        help="rows fetched per read (repeatable), default 10, 100 and 1000")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path, engine = temp_database("listing.db")
+    print(f"seeding {args.articles} articles ({args.content_words} words each) in {path} ...")
+    seed_articles(engine, args.articles, content_words=args.content_words)
+
+    for rows in args.rows or [10, 100, 1000]:
+        print(f"{rows} rows")
+        for name, build in (("full objects", full_objects), ("deferred body", deferred_objects), ("projection", projection)):
+            latency, peak = measure(engine, build, rows, args.repeat)
+            print(f"  {name:>14}: p50 {fmt_ms(latency)}  peak {peak / 1024:10.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
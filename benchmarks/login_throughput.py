@@ -0,0 +1,81 @@
+"""Login throughput under concurrency with the bounded hashing pool.
+
+    python benchmarks/login_throughput.py --threads 32 --logins 200 --hash-workers 4
+
+Every thread posts valid credentials to /login through its own test client.
+Rejected attempts (503, pool saturated) are counted separately: they return
+immediately instead of holding a request thread.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import common  # noqa: F401  (puts the project on sys.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--hash-workers', type=int, default=4)
+    parser.add_argument('--method', default='scrypt')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="blog-bench-"), "login.db")
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    os.environ['PASSWORD_HASH_METHOD'] = args.method
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.hash_workers)
+    os.environ.setdefault('MY_KEY', 'benchmark')
+    # measure the app, not the login throttling
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+    from app import app
+    from models import User, db
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', full_name='Bench')
+        user.password = 'secret'
+        db.session.add(user)
+        db.session.commit()
+
+    counts = {'ok': 0, 'busy': 0, 'other': 0}
+    latencies = []
+    lock = threading.Lock()
+    remaining = [args.logins]
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            response = client.post('/login', data={'username': 'bench', 'password_hash': 'secret'})
+            elapsed = time.perf_counter() - start
+            client.get('/logout')
+            key = {302: 'ok', 503: 'busy'}.get(response.status_code, 'other')
+            with lock:
+                counts[key] += 1
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{args.logins} logins, {args.threads} threads, {args.hash_workers} hash workers, method {args.method}")
+    print(f"  {counts['ok'] / total:8.1f} successful logins/s  ({counts['ok']} ok, {counts['busy']} rejected 503, {counts['other']} other)")
+    print(f"  p50 {latencies[len(latencies) // 2] * 1000:.1f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Cost of the login rate limiter per request, memory and SQLite stores.
+
+    python benchmarks/rate_limiter.py --hits 200000 --keys 50000 --max-keys 10000
+
+Replays hits from --keys distinct client addresses (half of them also
+carrying a username), plus an --attack share of hits from a single
+address, against each store. Reports the time per hit, the rejections,
+and the number of keys kept (the memory store never goes over
+--max-keys, the SQLite one is pruned back to it every 1000 hits).
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import common  # noqa: F401  (puts the project on sys.path)
+
+from ratelimit import MemoryStore, SQLiteStore, parse_rule
+
+
+def replay(store, hits, keys, attack, ip_rule, user_rule):
+    rng = random.Random(1)
+    ip_limit, ip_window = parse_rule(ip_rule)
+    user_limit, user_window = parse_rule(user_rule)
+    rejected = 0
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(hits):
+        n = 0 if rng.random() < attack else rng.randrange(1, keys)
+        checks = [(f"ip:10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}", ip_limit, ip_window)]
+        if n % 2:
+            checks.append((f"user:user{n}", user_limit, user_window))
+        # a simulated clock: 1000 hits per second
+        if store.hit(checks, now + i / 1000) is not None:
+            rejected += 1
+    return time.perf_counter() - start, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hits', type=int, default=200000)
+    parser.add_argument('--keys', type=int, default=50000)
+    parser.add_argument('--max-keys', type=int, default=10000)
+    parser.add_argument('--attack', type=float, default=0.1)
+    parser.add_argument('--ip-rule', default='20/60')
+    parser.add_argument('--user-rule', default='10/300')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="blog-bench-"), "ratelimit.db")
+    for name, store in (("memory", MemoryStore(args.max_keys)), ("sqlite", SQLiteStore(path, args.max_keys))):
+        hits = args.hits if name == "memory" else args.hits // 10
+        seconds, rejected = replay(store, hits, args.keys, args.attack, args.ip_rule, args.user_rule)
+        if name == "memory":
+            kept = len(store._states)
+        else:
+            kept = store._connection().execute("SELECT count(*) FROM rate_limit").fetchone()[0]
+        print(f"{name:>7}: {hits} hits, {seconds / hits * 1e6:7.1f} us/hit,"
+              f" {rejected} rejected, {kept} keys kept (max {args.max_keys})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Route level benchmark of the app through the Flask test client.
+
+    python benchmarks/routes.py --articles 10000 --requests 200 --output results.json
+    python benchmarks/routes.py --articles 10000 --compare results.json
+
+Seeds a fresh database with `flask seed`'s generator, then drives every
+route (public pages, search, login, admin user list, add/edit/delete
+article) and reports throughput and p50/p95/p99 latency per route. Results
+are saved as JSON; --compare exits with status 1 when a route's p95 got
+slower than the baseline by more than --threshold.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import tempfile
+import time
+from datetime import datetime
+
+import common  # noqa: F401  (puts the project on sys.path)
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, total):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput': round(len(latencies) / total, 2) if total else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def setup_app(args):
+    path = os.path.join(tempfile.mkdtemp(prefix="blog-bench-"), "routes.db")
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    os.environ.setdefault('MY_KEY', 'benchmark')
+    # measure the app, not the login throttling
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    if args.no_cache:
+        os.environ['PAGE_CACHE_BACKEND'] = 'null'
+    if args.db_profile:
+        os.environ['DB_PROFILE'] = args.db_profile
+
+    from app import app
+    from models import User, db
+    from seed import seed
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        print(f"seeding {args.articles} articles and {args.users} users in {path} ...")
+        seed(db.engine, articles=args.articles, users=args.users)
+        admin = User(username='bench-admin', full_name='Bench Admin', is_admin=True)
+        admin.password = 'secret'
+        db.session.add(admin)
+        db.session.commit()
+    return app
+
+
+def scenarios(app, args):
+    from models import Article, db
+
+    with app.app_context():
+        max_id = db.session.query(db.func.max(Article.id)).scalar() or 1
+    rng = random.Random(1)
+
+    anon = app.test_client()
+    admin = app.test_client()
+    admin.post('/login', data={'username': 'bench-admin', 'password_hash': 'secret'})
+
+    # a cursor half way through the listing
+    deep = None
+    page = anon.get('/articles?per_page=100').get_data(as_text=True)
+    for _ in range(min(50, args.articles // 200)):
+        match = re.search(r'href="(/articles\?after=[^"]+)"', page)
+        if not match:
+            break
+        deep = match.group(1).replace('&amp;', '&')
+        page = anon.get(deep).get_data(as_text=True)
+    deep = deep or '/articles'
+
+    counter = itertools.count()
+    created = []
+
+    def add_article():
+        n = next(counter)
+        response = admin.post('/add_article', data={
+            'title': f"bench article {n}", 'slug': f"bench-{n}", 'extrait': "extrait",
+            'content': "contenu " * 200, 'category': "General"})
+        with app.app_context():
+            created.append(db.session.query(Article.id).filter_by(title=f"bench article {n}").scalar())
+        return response
+
+    def edit_article():
+        n = next(counter)
+        return admin.post(f'/edit_article/{rng.choice(created)}', data={
+            'title': f"bench edit {n}", 'slug': f"bench-{n}", 'extrait': "extrait",
+            'content': "contenu modifie " * 200, 'category': "General"})
+
+    def delete_article():
+        return admin.get(f'/delete_article/{created.pop()}')
+
+    def login():
+        client = app.test_client()
+        return client.post('/login', data={'username': 'bench-admin', 'password_hash': 'secret'})
+
+    return [
+        ('GET /', lambda: anon.get('/')),
+        ('GET /articles', lambda: anon.get('/articles')),
+        ('GET /articles (deep cursor)', lambda: anon.get(deep)),
+        ('GET /articles/<id>', lambda: anon.get(f'/articles/{rng.randint(1, max_id)}')),
+        ('GET /search', lambda: anon.get('/search?q=' + rng.choice(['frein', 'permis route', 'radar nuit']))),
+        ('GET /add_user (admin list)', lambda: admin.get('/add_user')),
+        ('POST /login', login),
+        ('POST /add_article', add_article),
+        ('POST /edit_article/<id>', edit_article),
+        ('GET /delete_article/<id>', delete_article),
+    ]
+
+
+def run(app, args):
+    results = {}
+    for name, request in scenarios(app, args):
+        count = args.login_requests if name == 'POST /login' else args.requests
+        for _ in range(min(args.warmup, count)):
+            if name != 'GET /delete_article/<id>':
+                request()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(count):
+            t = time.perf_counter()
+            response = request()
+            latencies.append(time.perf_counter() - t)
+            if response.status_code >= 400:
+                raise SystemExit(f"{name}: HTTP {response.status_code}")
+        results[name] = summarize(latencies, time.perf_counter() - start)
+        r = results[name]
+        print(f"{name:<30} {r['throughput']:9.1f} req/s   p50 {r['p50_ms']:8.2f} ms   "
+              f"p95 {r['p95_ms']:8.2f} ms   p99 {r['p99_ms']:8.2f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get('routes', {}).get(name)
+        if not before or not before['p95_ms']:
+            continue
+        change = current['p95_ms'] / before['p95_ms'] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{name:<30} p95 {before['p95_ms']:8.2f} -> {current['p95_ms']:8.2f} ms  ({change:+.0%}) {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200, help="requests per route")
+    parser.add_argument('--login-requests', type=int, default=20, help="requests for POST /login (hashing is slow)")
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--no-cache', action='store_true', help="disable the page cache")
+    parser.add_argument('--db-profile', help="DB_PROFILE to run with")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file from a previous run")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    app = setup_app(args)
+    results = run(app, args)
+
+    report = {
+        'date': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'args': vars(args),
+        'routes': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""FTS5 search vs a naive LIKE scan over Article.content.
+
+    python benchmarks/search_vs_like.py --articles 20000 --repeat 20
+"""
+import argparse
+
+from common import fmt_ms, seed_articles, temp_database, timed
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from models import Article
+from search import search_articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--terms', action='append',
+                        help="query to run (repeatable), defaults to a common and a rare query")
+    args = parser.parse_args()
+
+    path, engine = temp_database("search.db")
+    print(f"seeding {args.articles} articles in {path} ...")
+    seed_articles(engine, args.articles)
+
+    queries = args.terms or ["frein brouillard", str(args.articles // 2)]
+
+    with Session(engine) as session:
+        for terms in queries:
+            words = terms.split()
+
+            def fts():
+                search_articles(session, terms, page=1, per_page=10)
+
+            def like():
+                stmt = select(Article.id, Article.title).order_by(Article.created_at).limit(10)
+                for word in words:
+                    pattern = f"%{word}%"
+                    stmt = stmt.where(or_(Article.title.like(pattern), Article.extrait.like(pattern), Article.content.like(pattern)))
+                session.execute(stmt).all()
+
+            print(f"query {terms!r}")
+            for name, fn in (("fts5", fts), ("like", like)):
+                t = timed(fn, args.repeat)
+                print(f"  {name:>5}: p50 {fmt_ms(t[len(t) // 2])}  max {fmt_ms(t[-1])}")
+
+
+if __name__ == '__main__':
+    main()
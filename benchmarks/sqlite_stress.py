@@ -0,0 +1,129 @@
+"""Multi-process read/write stress test of the SQLite engine profiles.
+
+    python benchmarks/sqlite_stress.py --readers 6 --writers 2 --seconds 10
+
+Reader processes page through the listing while writer processes insert and
+update articles. Each profile runs on a fresh database; the script reports
+operations per second and the number of failed operations ("database is
+locked"), and exits with status 1 if the production profile had failures.
+The driver's own busy wait is disabled, so the default profile (rollback
+journal, no busy_timeout) fails where the production one waits.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+from common import seed_articles, synthetic_articles, temp_database
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+import db_profile
+from models import Article
+
+
+def make_engine(path, profile):
+    config = {'DB_PROFILE': profile, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}"}
+    # no busy wait from the driver (python's sqlite3 waits 5s by default):
+    # only the profile's busy_timeout makes a connection wait for the lock,
+    # so the default profile (rollback journal, no busy_timeout) shows the
+    # "database is locked" failures the production one removes
+    engine = create_engine(config['SQLALCHEMY_DATABASE_URI'], connect_args={'timeout': 0},
+                           **db_profile.engine_options(config))
+    db_profile.apply_pragmas(engine, db_profile.pragmas_for(config))
+    return engine
+
+
+def reader(path, profile, seconds, results):
+    engine = make_engine(path, profile)
+    ok = failed = 0
+    slowest = 0.0
+    deadline = time.monotonic() + seconds
+    rng = random.Random(os.getpid())
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                offset = rng.randrange(0, 1000)
+                connection.execute(
+                    select(Article.id, Article.title, Article.extrait, Article.created_at)
+                    .order_by(Article.created_at, Article.id).offset(offset).limit(20)
+                ).all()
+            ok += 1
+        except OperationalError:
+            failed += 1
+        slowest = max(slowest, time.perf_counter() - start)
+    results.put(('read', ok, failed, slowest))
+
+
+def writer(path, profile, seconds, results, start):
+    engine = make_engine(path, profile)
+    ok = failed = 0
+    deadline = time.monotonic() + seconds
+    rows = synthetic_articles(10 ** 7, content_words=200, start=start)
+    rng = random.Random(start)
+    while time.monotonic() < deadline:
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert(Article.__table__), [next(rows) for _ in range(5)])
+                connection.execute(
+                    update(Article.__table__)
+                    .where(Article.__table__.c.id == rng.randrange(1, 1000))
+                    .values(extrait="edited")
+                )
+            ok += 1
+        except OperationalError:
+            failed += 1
+    results.put(('write', ok, failed, 0.0))
+
+
+def run(profile, args):
+    path, engine = temp_database(f"stress-{profile}.db")
+    seed_articles(engine, 2000, content_words=200)
+    engine.dispose()
+    # switch the file to WAL once before the workers start
+    make_engine(path, profile).connect().close()
+
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=reader, args=(path, profile, args.seconds, results))
+             for _ in range(args.readers)]
+    procs += [multiprocessing.Process(target=writer, args=(path, profile, args.seconds, results, (i + 1) * 10 ** 7))
+              for i in range(args.writers)]
+    for p in procs:
+        p.start()
+    totals = {'read': [0, 0, 0.0], 'write': [0, 0, 0.0]}
+    for _ in procs:
+        kind, ok, failed, slowest = results.get()
+        totals[kind][0] += ok
+        totals[kind][1] += failed
+        totals[kind][2] = max(totals[kind][2], slowest)
+    for p in procs:
+        p.join()
+
+    print(f"{profile}:")
+    for kind, (ok, failed, slowest) in totals.items():
+        line = f"  {kind:>5}: {ok / args.seconds:8.1f} ops/s  {failed} failed"
+        if kind == 'read':
+            line += f"  slowest read {slowest * 1000:.1f} ms"
+        print(line)
+    return totals['read'][1] + totals['write'][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profile', action='append', choices=sorted(db_profile.PROFILES),
+                        help="profile to run (repeatable), default all")
+    args = parser.parse_args()
+
+    failures = {profile: run(profile, args) for profile in args.profile or ['default', 'production']}
+    if failures.get('production'):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
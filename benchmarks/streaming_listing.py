@@ -0,0 +1,101 @@
+"""Full listing: streamed /articles/all vs rendering the whole page at once.
+
+    python benchmarks/streaming_listing.py --articles 100000 --max-peak-mb 16
+
+Reports time to first byte, total time and peak Python memory (tracemalloc)
+for both, and exits with status 1 when the streamed page peaks above
+--max-peak-mb, so it can run as a check.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from common import seed_articles, temp_database
+
+
+def traced(fn):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte, size = fn()
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte - start, total, size, peak
+
+
+def streamed(client):
+    def run():
+        response = client.get('/articles/all', buffered=False)
+        assert response.status_code == 200, response.status_code
+        first_byte, size = None, 0
+        for chunk in response.response:
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            size += len(chunk)
+        response.close()
+        return first_byte, size
+    return run
+
+
+def rendered(app):
+    # what a non streamed view does: every row, then the whole string
+    from flask import render_template
+    from sqlalchemy import select
+
+    from models import Article, db
+
+    def run():
+        with app.test_request_context('/articles/all'):
+            stmt = select(Article.id, Article.title, Article.extrait, Article.created_at)
+            rows = db.session.execute(stmt.order_by(Article.created_at, Article.id)).all()
+            html = render_template('articles.html', articles=rows, page=None)
+            db.session.remove()
+            return time.perf_counter(), len(html.encode())
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=100000)
+    parser.add_argument('--yield-per', type=int, default=500)
+    parser.add_argument('--max-peak-mb', type=float, default=16.0)
+    args = parser.parse_args()
+
+    path, engine = temp_database("streaming.db")
+    print(f"seeding {args.articles} articles in {path} ...")
+    seed_articles(engine, args.articles, content_words=10)
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    os.environ['LISTING_YIELD_PER'] = str(args.yield_per)
+    os.environ['PAGE_CACHE_BACKEND'] = 'null'
+    os.environ.setdefault('MY_KEY', 'benchmark')
+    from app import app
+    from models import User, db
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        admin = User(username='bench-admin', full_name='Bench Admin', is_admin=True)
+        admin.password = 'secret'
+        db.session.add(admin)
+        db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench-admin', 'password_hash': 'secret'})
+
+    results = {}
+    for name, run in (("streamed", streamed(client)), ("rendered", rendered(app))):
+        ttfb, total, size, peak = traced(run)
+        results[name] = peak
+        print(f"  {name:>8}: first byte {ttfb * 1000:9.1f} ms  total {total * 1000:9.1f} ms"
+              f"  {size / 2**20:7.1f} MiB sent  peak {peak / 2**20:8.1f} MiB")
+
+    if results['streamed'] > args.max_peak_mb * 2**20:
+        print(f"FAIL: streamed listing peaked above {args.max_peak_mb} MiB")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
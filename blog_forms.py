@@ -4,6 +4,9 @@ from wtforms.validators import DataRequired, EqualTo, Length
 from datetime import datetime
 
 
+# the article categories, also used by the listing filter and the seeder
+CATEGORIES = ["General", "Lois de conduite", "Lois au Maroc", "Technique de conduite", "Evenement"]
+
 
 # create an article form class
 class ArticleFrom(FlaskForm):
@@ -11,7 +14,7 @@ class ArticleFrom(FlaskForm):
     slug = StringField("Slug de l'article", validators=[DataRequired()])
     extrait = TextAreaField("Extrait de l'article", validators=[DataRequired()])
     content = TextAreaField("Contenu de l'article", validators=[DataRequired()])
-    category = SelectField("Categorie",validators=[DataRequired()],choices=["General", "Lois de conduite", "Lois au Maroc", "Technique de conduite", "Evenement"])
+    category = SelectField("Categorie",validators=[DataRequired()],choices=CATEGORIES)
     submit = SubmitField("Soumettre")
 
 
@@ -0,0 +1,47 @@
+from sqlalchemy import delete, func, insert, select, update
+
+from models import Article, CategoryCount
+
+
+# Per category article counts for the listing sidebar.
+#
+# category_count holds one row per category. The article write paths
+# (add / edit / delete_article, flask articles import) adjust it in their
+# own transaction with adjust_counts(), so reading the counts is a scan of
+# a handful of rows instead of a GROUP BY over the articles.
+# rebuild_counts() recomputes everything (seeding, `flask articles recount`).
+
+table = CategoryCount.__table__
+
+
+def adjust_counts(connection, deltas):
+    """Add `deltas` ({category: +n / -n}) to the counts.
+
+    `connection` is a Connection or a Session, the change is part of its
+    current transaction.
+    """
+    for category, delta in deltas.items():
+        if not delta:
+            continue
+        result = connection.execute(
+            update(table).where(table.c.category == category).values(count=table.c.count + delta))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(category=category, count=max(delta, 0)))
+
+
+def rebuild_counts(connection):
+    connection.execute(delete(table))
+    rows = connection.execute(
+        select(Article.category, func.count()).group_by(Article.category)).all()
+    if rows:
+        connection.execute(insert(table), [{'category': category, 'count': count} for category, count in rows])
+    return len(rows)
+
+
+# the sidebar query, also run as is by the async views (asgi.py)
+COUNTS_QUERY = select(table.c.category, table.c.count).where(table.c.count > 0).order_by(table.c.category)
+
+
+def category_counts(session):
+    """[(category, count)] of the categories having articles."""
+    return session.execute(COUNTS_QUERY).all()
@@ -0,0 +1,215 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import shutil
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, or_, select, update
+
+from models import Article, db
+import assets
+import categories
+from freeze import freezer
+import search
+import transfer
+from renderers import render_rows, renderer_version
+from seed import seed
+from template_cache import template_cache
+
+
+# ################################ search: ################################
+
+search_cli = AppGroup('search', help="Full text search index.")
+
+
+@search_cli.command('rebuild')
+def search_rebuild():
+    """Create the FTS5 index if needed and reindex every article."""
+    with db.engine.begin() as connection:
+        count = search.rebuild_index(connection)
+    click.echo(f"{count} articles indexed.")
+
+
+# ################################ seed: ################################
+
+
+@click.command('seed')
+@click.option('--articles', default=1000, show_default=True, help="Synthetic articles to add.")
+@click.option('--users', default=0, show_default=True, help="Synthetic users to add (password: 'password').")
+@click.option('--chunk', default=10000, show_default=True, help="Rows per insert transaction.")
+@click.option('--content-words', default=300, show_default=True, help="Words per article body.")
+def seed_command(articles, users, chunk, content_words):
+    """Fill the database with synthetic articles and users."""
+    db.create_all()
+    report = seed(db.engine, articles=articles, users=users, chunk=chunk, content_words=content_words,
+                  renderer=current_app.config['ARTICLE_RENDERER'])
+    for table, (count, seconds) in report.items():
+        click.echo(f"{count} {table} in {seconds:.1f}s ({count / seconds:.0f} rows/s)")
+
+
+# ################################ articles: ################################
+
+articles_cli = AppGroup('articles', help="Article maintenance.")
+
+
+def _stale_batches(renderer, batch, force):
+    # keyset over id, so every batch is one index range scan
+    version = renderer_version(renderer)
+    last_id = 0
+    while True:
+        stmt = select(Article.id, Article.content).where(Article.id > last_id).order_by(Article.id).limit(batch)
+        if not force:
+            stmt = stmt.where(or_(Article.content_renderer.is_(None), Article.content_renderer != version))
+        rows = [tuple(row) for row in db.session.execute(stmt)]
+        db.session.rollback()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+@articles_cli.command('rerender')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help="Rendering processes.")
+@click.option('--batch', default=500, show_default=True, help="Articles per batch.")
+@click.option('--all', 'force', is_flag=True, help="Rerender every article, not only the stale ones.")
+def articles_rerender(workers, batch, force):
+    """Render content_html of the articles made by another renderer version."""
+    renderer = current_app.config['ARTICLE_RENDERER']
+    version = renderer_version(renderer)
+    table = Article.__table__
+    stmt = update(table).where(table.c.id == bindparam('_id')).values(
+        content_html=bindparam('_html'), content_renderer=version)
+    page_cache = current_app.extensions.get('page_cache')
+
+    start = time.perf_counter()
+    count = 0
+
+    def write(rendered):
+        # rendering runs in the pool, the writes stay in this process (one sqlite writer)
+        with db.engine.begin() as connection:
+            connection.execute(stmt, [{'_id': id, '_html': html} for id, html in rendered])
+        if page_cache is not None:
+            page_cache.invalidate(*(f"article:{id}" for id, _ in rendered))
+        return len(rendered)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for rows in _stale_batches(renderer, batch, force):
+            pending.append(pool.submit(render_rows, renderer, rows))
+            # keep a bounded number of batches in flight
+            if len(pending) >= workers * 2:
+                count += write(pending.pop(0).result())
+        for future in pending:
+            count += write(future.result())
+
+    seconds = time.perf_counter() - start
+    click.echo(f"{count} articles rendered with {version} in {seconds:.1f}s.")
+
+
+@articles_cli.command('recount')
+def articles_recount():
+    """Recompute the per category article counts of the listing sidebar."""
+    with db.engine.begin() as connection:
+        count = categories.rebuild_counts(connection)
+    click.echo(f"{count} categories counted.")
+
+
+@articles_cli.command('export')
+@click.argument('output', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--batch', default=1000, show_default=True, help="Rows fetched per round trip.")
+def articles_export(output, batch):
+    """Write every article as JSON lines to OUTPUT (default: stdout)."""
+    start = time.perf_counter()
+    count = transfer.export_articles(db.session, output, batch=batch)
+    seconds = time.perf_counter() - start
+    # stdout may be the export itself
+    click.echo(f"{count} articles exported in {seconds:.1f}s ({count / max(seconds, 1e-9):.0f} rows/s).", err=True)
+
+
+@articles_cli.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'), default='-')
+@click.option('--chunk', default=1000, show_default=True, help="Articles per insert transaction.")
+def articles_import(source, chunk):
+    """Add the articles of the JSON lines file SOURCE (default: stdin), skipping known titles."""
+    start = time.perf_counter()
+    report = transfer.import_articles(db.engine, source, chunk=chunk,
+                                      renderer=current_app.config['ARTICLE_RENDERER'])
+    seconds = time.perf_counter() - start
+    for number, message in report['errors'][:20]:
+        click.echo(f"line {number}: {message}", err=True)
+    if len(report['errors']) > 20:
+        click.echo(f"... and {len(report['errors']) - 20} more invalid lines", err=True)
+    page_cache = current_app.extensions.get('page_cache')
+    if page_cache is not None and report['imported']:
+        page_cache.invalidate("articles")
+    click.echo(f"{report['imported']} articles imported, {report['duplicates']} duplicate titles skipped, "
+               f"{report['invalid']} invalid lines, in {seconds:.1f}s "
+               f"({report['imported'] / max(seconds, 1e-9):.0f} rows/s).")
+
+
+# ################################ assets: ################################
+
+assets_cli = AppGroup('assets', help="Static assets.")
+
+
+@assets_cli.command('build')
+@click.option('--brotli/--no-brotli', default=True, help="Also write .br variants (needs the brotli package).")
+@click.option('--clean', is_flag=True, help="Remove the previous build first.")
+def assets_build(brotli, clean):
+    """Write content hashed, precompressed copies of static/ and their manifest."""
+    dist = os.path.join(current_app.static_folder, assets.DIST)
+    if clean and os.path.isdir(dist):
+        shutil.rmtree(dist)
+    manifest = assets.build(current_app.static_folder, brotli_variants=brotli)
+    current_app.extensions['assets'].load(current_app)
+    if brotli and assets.brotli is None:
+        click.echo("brotli is not installed, only .gz variants were written.")
+    click.echo(f"{len(manifest)} files written to {dist}.")
+
+
+# ################################ freeze: ################################
+
+
+@click.command('freeze')
+@click.option('--output', type=click.Path(file_okay=False), help="Output directory (default: FREEZE_DIR or instance/frozen).")
+@click.option('--workers', type=int, help="Rendering threads (default: FREEZE_WORKERS).")
+@click.option('--all', 'force', is_flag=True, help="Render every page, not only the stale ones.")
+def freeze_command(output, workers, force):
+    """Render the public pages to static html, only the ones that changed."""
+    output = output or current_app.config['FREEZE_DIR'] or os.path.join(current_app.instance_path, 'frozen')
+    start = time.perf_counter()
+    report = freezer.freeze(output, workers=workers, force=force)
+    seconds = time.perf_counter() - start
+    click.echo(f"{report['written']} pages written, {report['unchanged']} unchanged, "
+               f"{report['skipped']} up to date, {report['removed']} removed, {report['failed']} failed "
+               f"in {seconds:.1f}s ({output}).")
+    if not current_app.config['SITE_URL']:
+        click.echo("SITE_URL is not set: sitemap.xml and feed.atom were not frozen.")
+
+
+# ################################ templates: ################################
+
+templates_cli = AppGroup('templates', help="Jinja templates.")
+
+
+@templates_cli.command('compile')
+@click.option('--clean', is_flag=True, help="Remove the cached bytecode first (e.g. of deleted templates).")
+def templates_compile(clean):
+    """Compile every template of templates/ into the bytecode cache (TEMPLATE_CACHE_DIR)."""
+    if template_cache.cache is None:
+        raise click.ClickException("TEMPLATE_CACHE_DIR is empty: the bytecode cache is disabled.")
+    start = time.perf_counter()
+    names = template_cache.compile(clean=clean)
+    seconds = time.perf_counter() - start
+    click.echo(f"{len(names)} templates compiled in {seconds:.2f}s ({current_app.config['TEMPLATE_CACHE_DIR']}).")
+
+
+def register_commands(app):
+    app.cli.add_command(search_cli)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(articles_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(freeze_command)
+    app.cli.add_command(templates_cli)
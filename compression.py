@@ -0,0 +1,146 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, br is only offered when installed
+    brotli = None
+
+
+# Dynamic response compression (gzip / deflate / br).
+#
+# Runs as an after_request hook: small bodies, non text types, files sent
+# by send_file (static, already precompressed by `flask assets build`) and
+# responses that already have a Content-Encoding are left alone. Streamed
+# responses are compressed as they go, with a sync flush every
+# COMPRESS_STREAM_FLUSH bytes of input, so only that much is ever held back.
+# A strong ETag gets the encoding appended, since the bytes differ.
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/javascript', 'text/csv',
+    'application/json', 'application/javascript', 'application/xml',
+    'application/atom+xml', 'application/rss+xml', 'image/svg+xml',
+}
+
+
+class _ZlibEncoder:
+
+    def __init__(self, encoding, level):
+        # wbits: +16 writes a gzip container, plain MAX_WBITS a zlib one ("deflate" in http)
+        wbits = zlib.MAX_WBITS | 16 if encoding == 'gzip' else zlib.MAX_WBITS
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class Compress:
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_STREAM_FLUSH', 4096)
+        app.config.setdefault('COMPRESS_MIMETYPES', COMPRESSIBLE_MIMETYPES)
+        app.extensions['compress'] = self
+        self.app = app
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self.after_request)
+
+    def encodings(self):
+        return ['br', 'gzip', 'deflate'] if brotli is not None else ['gzip', 'deflate']
+
+    def etag_suffix(self):
+        """What this request's compressed responses append to their ETag, '' if sent as is."""
+        if not self.app.config['COMPRESS_ENABLED']:
+            return ''
+        encoding = request.accept_encodings.best_match(self.encodings())
+        return f"-{encoding}" if encoding is not None else ''
+
+    def _encoder(self, encoding):
+        config = self.app.config
+        if encoding == 'br':
+            return _BrotliEncoder(config['COMPRESS_BR_LEVEL'])
+        return _ZlibEncoder(encoding, config['COMPRESS_LEVEL'])
+
+    def after_request(self, response):
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in self.app.config['COMPRESS_MIMETYPES']
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.response, self._encoder(encoding),
+                                             self.app.config['COMPRESS_STREAM_FLUSH'])
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.app.config['COMPRESS_MIN_SIZE']:
+                return response
+            encoder = self._encoder(encoding)
+            response.set_data(encoder.compress(data) + encoder.finish())
+
+        response.content_encoding = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
+
+    def _stream(self, chunks, encoder, flush_size):
+        pending = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                data = encoder.compress(chunk)
+                pending += len(chunk)
+                if pending >= flush_size:
+                    data += encoder.flush()
+                    pending = 0
+                if data:
+                    yield data
+            yield encoder.finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+
+compress = Compress()
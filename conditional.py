@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+
+
+# Conditional GET: answer If-None-Match / If-Modified-Since with a 304
+# before the view runs, so an unchanged page costs one small query instead
+# of the full query + template render.
+#
+# The ETag also holds the site version, a hash of the templates and of the
+# assets manifest: after a deploy that changes them, pages whose rows did
+# not change are rendered again instead of answered with a stale 304.
+
+
+def compute_site_version(app):
+    # templates, static files and the site address: a change there touches every page
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+        dirs.sort()
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(name.encode() + f.read())
+    digest.update((app.config['SITE_URL'] or '').encode())
+    assets = app.extensions.get('assets')
+    if assets is not None:
+        digest.update(json.dumps(assets.manifest, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def site_version():
+    # read once per process, a deploy restarts the workers
+    app = current_app._get_current_object()
+    version = app.extensions.get('site_version')
+    if version is None:
+        version = app.extensions['site_version'] = compute_site_version(app)
+    return version
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr((site_version(),) + parts).encode()).hexdigest()
+
+
+def as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # the models store naive utc datetimes
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def representation_etag(etag):
+    # the compressed representation carries its encoding in the etag (see compression.py)
+    compress = current_app.extensions.get('compress')
+    return etag + compress.etag_suffix() if compress is not None else etag
+
+
+def not_modified(etag, last_modified=None):
+    """The 304 answering this request, or None when the client's copy is stale."""
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110)
+    if request.if_none_match:
+        # bodies under COMPRESS_MIN_SIZE are sent as is, with the bare etag:
+        # answer with the one the client holds, only for this request's encoding
+        for candidate in (representation_etag(etag), etag):
+            if request.if_none_match.contains(candidate):
+                return set_validators(make_response('', 304), candidate, last_modified)
+        return None
+    if last_modified is not None and request.if_modified_since is not None \
+            and last_modified <= request.if_modified_since:
+        return set_validators(make_response('', 304), representation_etag(etag), last_modified)
+    return None
+
+
+def set_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # the page changes with the login state, and must be revalidated each time
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def conditional(validator):
+    """Send ETag / Last-Modified from a GET view and answer 304 when they match.
+
+    `validator` receives the view arguments and returns a tuple
+    ``(version, last_modified)`` describing the current state of the data,
+    or None to skip validation (e.g. the row doesn't exist and the view 404s).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # pending flash messages are rendered in the page
+            if request.method != 'GET' or session.get('_flashes'):
+                return f(*args, **kwargs)
+            state = validator(**kwargs)
+            if state is None:
+                return f(*args, **kwargs)
+            version, last_modified = state
+            last_modified = as_utc(last_modified)
+            etag = make_etag(version, current_user.is_authenticated, request.full_path)
+
+            response = not_modified(etag, last_modified)
+            if response is not None:
+                return response
+
+            # the page cache keys the body on it (see page_cache.py)
+            g.etag = etag
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                set_validators(response, etag, last_modified)
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,95 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+# SQLite engine profiles, selected with DB_PROFILE.
+#
+# "production" is meant for several gunicorn workers on one database file:
+# WAL lets readers run while a writer commits, busy_timeout makes writers
+# wait for the lock instead of failing with "database is locked", and the
+# cache/mmap/temp_store settings keep hot pages in memory.
+# The pragmas are applied on every new connection of the pool.
+
+PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,       # ms
+        'cache_size': -64000,       # negative = KiB, so ~64MB per connection
+        'mmap_size': 268435456,     # 256MB
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def parse_bool(value):
+    # the config values may come from the environment: "0" and "false" are false
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+# pool settings read from the config when the database is a file
+POOL_OPTIONS = {
+    'SQLITE_POOL_SIZE': ('pool_size', int),
+    'SQLITE_MAX_OVERFLOW': ('max_overflow', int),
+    'SQLITE_POOL_TIMEOUT': ('pool_timeout', float),
+    'SQLITE_POOL_RECYCLE': ('pool_recycle', int),
+    'SQLITE_POOL_PRE_PING': ('pool_pre_ping', parse_bool),
+}
+
+# pragmas that need to write to the database file
+WRITE_PRAGMAS = {'journal_mode'}
+
+
+def pragmas_for(config):
+    profile = config.get('DB_PROFILE', 'default')
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE: {profile!r}")
+    pragmas = dict(PROFILES[profile])
+    # per setting overrides, e.g. SQLITE_PRAGMAS = {'busy_timeout': 10000}
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+
+def is_file_database(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(config):
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if is_file_database(config['SQLALCHEMY_DATABASE_URI']):
+        for key, (option, cast) in POOL_OPTIONS.items():
+            if config.get(key) is not None:
+                options.setdefault(option, cast(config[key]))
+    return options
+
+
+def apply_pragmas(engine, pragmas, read_only=False):
+    if read_only:
+        pragmas = {k: v for k, v in pragmas.items() if k not in WRITE_PRAGMAS}
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def configure(app):
+    """Set the pool options, call before db.init_app(app)."""
+    app.config.setdefault('DB_PROFILE', 'default')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+
+def attach(app, db):
+    """Hook the profile pragmas on the app engines, call after db.init_app(app)."""
+    pragmas = pragmas_for(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_pragmas(engine, pragmas)
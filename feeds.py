@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from datetime import timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from flask import url_for
+from sqlalchemy import select
+
+from models import Article
+
+
+# /sitemap.xml and /feed.atom.
+#
+# Both are built from a projection of Article and kept as bytes in a
+# FeedCache, next to the version of the data they were built from (the
+# listing validator, see articles_state in app.py). They are rebuilt on the
+# first request after an article changed, not on every write. Above
+# SITEMAP_MAX_URLS articles /sitemap.xml becomes a sitemap index pointing
+# to /sitemap-<n>.xml pages (the protocol allows 50000 urls per file).
+# Absolute urls start with `base_url`: SITE_URL when configured, else the
+# Host the request came with, in which case the entries are per host and
+# the cache is bounded (any client can send any Host).
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+
+def _iso(value):
+    # naive utc in the database
+    return value.replace(tzinfo=timezone.utc, microsecond=0).isoformat() if value else None
+
+
+def _url(base_url, endpoint, **values):
+    return base_url.rstrip('/') + url_for(endpoint, **values)
+
+
+class FeedCache:
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.builds = 0
+
+    def get(self, key, version, build):
+        """The bytes of `key` built from `version` of the data, built by `build()` if stale."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        # one build at a time; the others reuse it once done
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            data = build()
+            self._entries[key] = (version, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.builds += 1
+            return data
+
+
+def sitemap_pages(count, max_urls):
+    # the listing pages (index, articles) come first on page 1
+    return max(1, -(-(count + 2) // max_urls))
+
+
+def build_sitemap(session, page, max_urls, base_url, batch=1000):
+    """<urlset> of the sitemap page `page` (1-based)."""
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n']
+    offset = (page - 1) * max_urls
+    limit = max_urls
+    if page == 1:
+        for endpoint in ('index', 'articles'):
+            parts.append(f"<url><loc>{escape(_url(base_url, endpoint))}</loc></url>\n")
+        limit -= 2
+    else:
+        offset -= 2
+    stmt = (select(Article.id, Article.updated_at).order_by(Article.id)
+            .offset(offset).limit(limit).execution_options(yield_per=batch))
+    for id, updated_at in session.execute(stmt):
+        loc = escape(_url(base_url, 'article', id=id))
+        lastmod = f"<lastmod>{_iso(updated_at)}</lastmod>" if updated_at else ''
+        parts.append(f"<url><loc>{loc}</loc>{lastmod}</url>\n")
+    parts.append('</urlset>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def build_sitemap_index(pages, last_modified, base_url):
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n']
+    lastmod = f"<lastmod>{_iso(last_modified)}</lastmod>" if last_modified else ''
+    for page in range(1, pages + 1):
+        loc = escape(_url(base_url, 'sitemap_page', page=page))
+        parts.append(f"<sitemap><loc>{loc}</loc>{lastmod}</sitemap>\n")
+    parts.append('</sitemapindex>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def build_feed(session, title, size, base_url):
+    """Atom feed of the `size` latest articles."""
+    stmt = (select(Article.id, Article.title, Article.extrait, Article.created_at, Article.updated_at)
+            .order_by(Article.created_at.desc(), Article.id.desc()).limit(size))
+    rows = session.execute(stmt).all()
+    home = _url(base_url, 'index')
+    updated = max((row.updated_at or row.created_at for row in rows), default=None)
+    parts = [
+        f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="{ATOM_NS}">\n',
+        f"<title>{escape(title)}</title>\n",
+        f"<author><name>{escape(title)}</name></author>\n",
+        f"<id>{escape(home)}</id>\n",
+        f"<link href={quoteattr(home)}/>\n",
+        f"<link rel=\"self\" href={quoteattr(_url(base_url, 'feed'))}/>\n",
+        f"<updated>{_iso(updated) or '1970-01-01T00:00:00+00:00'}</updated>\n",
+    ]
+    for row in rows:
+        link = _url(base_url, 'article', id=row.id)
+        parts.append(
+            "<entry>"
+            f"<id>{escape(link)}</id>"
+            f"<title>{escape(row.title)}</title>"
+            f"<link href={quoteattr(link)}/>"
+            f"<published>{_iso(row.created_at)}</published>"
+            f"<updated>{_iso(row.updated_at or row.created_at)}</updated>"
+            f"<summary>{escape(row.extrait)}</summary>"
+            "</entry>\n"
+        )
+    parts.append('</feed>\n')
+    return ''.join(parts).encode('utf-8')
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import url_for
+from sqlalchemy import func, select
+
+from conditional import compute_site_version
+from jobs import jobs
+from models import Article, db
+
+
+# Static export of the public pages (flask freeze).
+#
+# /, /articles, every /articles/<id>, /sitemap.xml and /feed.atom are
+# rendered as an anonymous visitor through the test client and written
+# under the output directory (/articles/5 -> articles/5/index.html), for
+# nginx to serve with `try_files $uri $uri/index.html @app`. try_files
+# ignores the query string and the cookies: requests with either must go
+# to the app, or ?after= / ?category= and logged in users would get the
+# frozen anonymous page one, see deploy/nginx-frozen.conf.
+# The pages are rendered for SITE_URL; without it sitemap.xml and
+# feed.atom, made of absolute urls, are not frozen (the app serves them).
+#
+# manifest.json records, per page, the version of the data it was rendered
+# from (the article's updated_at, or the listing validator) and the sha256
+# of the file. A later run renders only the pages whose version changed,
+# rewrites only the files whose content changed and removes the pages of
+# deleted articles. A change of the templates or the static manifest
+# rebuilds everything. With FREEZE_DIR set, the article write handlers
+# refresh the pages they touch through a background job (page_changed).
+
+MANIFEST = 'manifest.json'
+
+
+def output_file(output, path):
+    if path.endswith('.xml') or path.endswith('.atom'):
+        return os.path.join(output, path.lstrip('/'))
+    return os.path.join(output, path.strip('/'), 'index.html')
+
+
+def _write_atomic(filename, data):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, filename)
+
+
+class Freezer:
+
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # set to refresh the frozen pages after each article write
+        app.config.setdefault('FREEZE_DIR', None)
+        app.config.setdefault('FREEZE_WORKERS', min(8, os.cpu_count() or 1))
+        app.config.setdefault('SITE_URL', None)
+        self.app = app
+        app.extensions['freezer'] = self
+
+    # ################################ versions: ################################
+
+    def site_version(self):
+        # computed again: the templates may have changed since this process started
+        return compute_site_version(self.app)
+
+    def listing_version(self):
+        # same state as the listing validator (articles_state in app.py)
+        last_modified, count = db.session.query(func.max(Article.updated_at), func.count(Article.id)).one()
+        return f"{last_modified.isoformat() if last_modified else ''}/{count}"
+
+    def version(self, path):
+        """Version of the data behind one page, None when it doesn't exist."""
+        endpoint, values = self.app.url_map.bind('').match(path)
+        if endpoint == 'index':
+            return 'static'
+        if endpoint == 'article':
+            updated_at = db.session.query(Article.updated_at).filter(Article.id == values['id']).scalar()
+            return updated_at.isoformat() if updated_at else None
+        return self.listing_version()
+
+    def pages(self):
+        """{path: version} of every public page, from the current data."""
+        listing = self.listing_version()
+        with self.app.test_request_context():
+            pages = {
+                url_for('index'): 'static',
+                url_for('articles'): listing,
+            }
+            if self.app.config['SITE_URL']:
+                pages[url_for('sitemap')] = listing
+                pages[url_for('feed')] = listing
+            stmt = select(Article.id, Article.updated_at).execution_options(yield_per=1000)
+            for id, updated_at in db.session.execute(stmt):
+                pages[url_for('article', id=id)] = updated_at.isoformat() if updated_at else ''
+        return pages
+
+    # ################################ rendering: ################################
+
+    def _render(self, client, path):
+        # the cached copy may predate a change made outside the app: render it again
+        page_cache = self.app.extensions.get('page_cache')
+        if page_cache is not None:
+            endpoint, values = self.app.url_map.bind('').match(path)
+            if endpoint in ('index', 'articles'):
+                page_cache.invalidate(endpoint)
+            elif endpoint == 'article':
+                page_cache.invalidate(f"article:{values['id']}")
+        # absolute urls (sitemap, feed) for the public address, not http://localhost
+        response = client.get(path, base_url=self.app.config['SITE_URL'] or 'http://localhost')
+        data = response.get_data() if response.status_code == 200 else None
+        response.close()
+        return path, response.status_code, data
+
+    def _load_manifest(self, output):
+        try:
+            with open(os.path.join(output, MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'site': None, 'pages': {}}
+
+    def _apply(self, output, manifest, path, version, status, data):
+        # with self._lock held
+        filename = output_file(output, path)
+        if data is None:
+            if os.path.exists(filename):
+                os.remove(filename)
+            manifest['pages'].pop(path, None)
+            return 'removed' if status == 404 else 'failed'
+        digest = hashlib.sha256(data).hexdigest()
+        entry = manifest['pages'].get(path)
+        changed = entry is None or entry['sha256'] != digest or not os.path.exists(filename)
+        if changed:
+            _write_atomic(filename, data)
+        manifest['pages'][path] = {'version': version, 'sha256': digest}
+        return 'written' if changed else 'unchanged'
+
+    def freeze(self, output, workers=None, force=False):
+        """Render the stale pages into `output`, returns {outcome: count}."""
+        workers = workers or int(self.app.config['FREEZE_WORKERS'])
+        manifest = self._load_manifest(output)
+        site = self.site_version()
+        if manifest['site'] != site:
+            force = True
+        pages = self.pages()
+        db.session.remove()
+
+        report = {'written': 0, 'unchanged': 0, 'skipped': 0, 'removed': 0, 'failed': 0}
+        stale = [path for path, version in pages.items()
+                 if force or manifest['pages'].get(path, {}).get('version') != version
+                 or not os.path.exists(output_file(output, path))]
+        report['skipped'] = len(pages) - len(stale)
+        for path in set(manifest['pages']) - set(pages):
+            filename = output_file(output, path)
+            if os.path.exists(filename):
+                os.remove(filename)
+            del manifest['pages'][path]
+            report['removed'] += 1
+
+        local = threading.local()
+
+        def render(path):
+            # a test client per thread, as an anonymous visitor
+            if not hasattr(local, 'client'):
+                local.client = self.app.test_client()
+            return self._render(local.client, path)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, status, data in pool.map(render, stale):
+                with self._lock:
+                    report[self._apply(output, manifest, path, pages[path], status, data)] += 1
+
+        manifest['site'] = site
+        _write_atomic(os.path.join(output, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode())
+        return report
+
+    def refresh(self, output, paths):
+        """Render `paths` again (the single page rebuild of the write handlers)."""
+        if not os.path.exists(os.path.join(output, MANIFEST)):
+            # never frozen: nothing to keep up to date
+            return
+        client = self.app.test_client()
+        with self._lock:
+            manifest = self._load_manifest(output)
+            for path in paths:
+                version = self.version(path)
+                _, status, data = self._render(client, path)
+                self._apply(output, manifest, path, version, status, data)
+            _write_atomic(os.path.join(output, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode())
+
+    def page_changed(self, article_id):
+        """Queue the refresh of an article's page and of the pages listing it."""
+        if not self.app.config['FREEZE_DIR']:
+            return
+        with self.app.test_request_context():
+            paths = [url_for('article', id=article_id), url_for('articles')]
+            if self.app.config['SITE_URL']:
+                paths += [url_for('sitemap'), url_for('feed')]
+        for path in paths:
+            jobs.enqueue('freeze.refresh', path)
+
+
+freezer = Freezer()
+
+
+@jobs.task('freeze.refresh', delay=2)
+def refresh_frozen_page(path):
+    freezer.refresh(freezer.app.config['FREEZE_DIR'], [path])
@@ -0,0 +1,79 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# Password hashing off the request threads.
+# scrypt / pbkdf2 are deliberately slow: a burst of logins can occupy every
+# worker thread. Hashes run in a small dedicated pool; when the pool and its
+# waiting slots are full the call fails at once with HasherBusy instead of
+# piling up, and the view answers 503.
+
+
+class HasherBusy(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    # the parameters werkzeug writes in front of the hash, e.g. "scrypt:32768:8:1"
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+class PasswordHasher:
+
+    def __init__(self, app=None):
+        self.method = 'scrypt'
+        self.salt_length = 16
+        self._executor = None
+        self._slots = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # any method accepted by werkzeug's generate_password_hash,
+        # e.g. "scrypt", "scrypt:65536:8:1" or "pbkdf2:sha256:600000"
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))
+        # calls allowed to wait for a worker before HasherBusy is raised
+        app.config.setdefault('PASSWORD_HASH_QUEUE', app.config['PASSWORD_HASH_WORKERS'] * 2)
+
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.salt_length = int(app.config['PASSWORD_SALT_LENGTH'])
+        workers = int(app.config['PASSWORD_HASH_WORKERS'])
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + int(app.config['PASSWORD_HASH_QUEUE']))
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args, **kwargs):
+        if self._executor is None:
+            # not attached to an app (scripts, shell): hash inline
+            return fn(*args, **kwargs)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, method=self.method, salt_length=self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when the stored hash was made with other parameters than the configured ones."""
+        return password_hash.split('$', 1)[0] != _method_prefix(self.method)
+
+
+hasher = PasswordHasher()
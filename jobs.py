@@ -0,0 +1,264 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('jobs')
+
+
+# In-process background jobs for the work that follows a write.
+#
+# Jobs are registered by name with @jobs.task(name) and queued with
+# jobs.enqueue(name, *args). A job waits `delay` seconds before running;
+# enqueueing the same name and arguments again while it waits is coalesced
+# into it, so ten quick edits cause one run. Jobs run on a small pool of
+# worker threads inside an app context, and are retried with exponential
+# backoff when they raise. When JOBS_MAX_PENDING jobs are already waiting
+# the job runs inline instead, nothing is dropped.
+#
+# With JOBS_STORE set, waiting jobs are also written to that SQLite file and
+# picked up again after a restart (arguments must be JSON serializable).
+# Jobs must be idempotent: a retried or reloaded job can run twice, and
+# every process sharing a store reloads its rows.
+#
+# Under app.testing (JOBS_EAGER) jobs run synchronously in the caller.
+
+
+class Job:
+
+    __slots__ = ('name', 'args', 'key', 'run_at', 'enqueued_at', 'attempts', 'store_id')
+
+    def __init__(self, name, args, run_at, enqueued_at=None, attempts=0, store_id=None):
+        self.name = name
+        self.args = tuple(args)
+        self.key = (name, json.dumps(args, sort_keys=True, default=str))
+        self.run_at = run_at
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        self.attempts = attempts
+        self.store_id = store_id
+
+
+class SQLiteJobStore:
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY, name TEXT NOT NULL, args TEXT NOT NULL,"
+            " run_at REAL NOT NULL, enqueued_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def add(self, job):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (name, args, run_at, enqueued_at, attempts) VALUES (?, ?, ?, ?, ?)",
+                (job.name, json.dumps(job.args), job.run_at, job.enqueued_at, job.attempts))
+            job.store_id = cursor.lastrowid
+
+    def update(self, job):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET run_at = ?, attempts = ? WHERE id = ?",
+                               (job.run_at, job.attempts, job.store_id))
+
+    def remove(self, job):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job.store_id,))
+
+    def load(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, name, args, run_at, enqueued_at, attempts FROM jobs ORDER BY run_at").fetchall()
+        return [Job(name, json.loads(args), run_at, enqueued_at, attempts, store_id)
+                for store_id, name, args, run_at, enqueued_at, attempts in rows]
+
+
+class JobQueue:
+
+    def __init__(self, app=None):
+        self.tasks = {}
+        self.app = None
+        self.store = None
+        self._cond = threading.Condition()
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._threads = []
+        self._pid = None
+        self._running = 0
+        self._counters = dict.fromkeys(('enqueued', 'coalesced', 'inline', 'completed', 'retried', 'failed'), 0)
+        self._waits = deque(maxlen=1000)
+        self._durations = deque(maxlen=1000)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOBS_WORKERS', 2)
+        app.config.setdefault('JOBS_MAX_PENDING', 1000)
+        app.config.setdefault('JOBS_MAX_ATTEMPTS', 3)
+        app.config.setdefault('JOBS_RETRY_DELAY', 1.0)
+        app.config.setdefault('JOBS_STORE', None)
+        # None: eager under app.testing
+        app.config.setdefault('JOBS_EAGER', None)
+        self.app = app
+        app.extensions['jobs'] = self
+
+    def task(self, name, delay=0.0):
+        """Register a job function under `name`, run `delay` seconds after it is queued."""
+        def decorator(fn):
+            self.tasks[name] = (fn, delay)
+            return fn
+        return decorator
+
+    # ################################ queueing: ################################
+
+    def enqueue(self, name, *args):
+        fn, delay = self.tasks[name]
+        config = self.app.config
+        eager = config['JOBS_EAGER']
+        if eager or (eager is None and self.app.testing):
+            fn(*args)
+            return
+
+        self._start()
+        job = Job(name, args, time.time() + delay)
+        with self._cond:
+            if job.key in self._pending:
+                self._counters['coalesced'] += 1
+                return
+            inline = len(self._pending) >= config['JOBS_MAX_PENDING']
+            if not inline:
+                if self.store is not None:
+                    self.store.add(job)
+                self._push(job)
+                self._counters['enqueued'] += 1
+                return
+            self._counters['inline'] += 1
+        # queue full: run it now rather than lose it
+        self._execute(job)
+
+    def _push(self, job):
+        # with self._cond held
+        self._pending[job.key] = job
+        heapq.heappush(self._heap, (job.run_at, next(self._seq), job))
+        self._cond.notify()
+
+    def _start(self):
+        # threads are started on first use, and again in a forked worker process
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._heap, self._pending = [], {}
+            # sqlite connections must not cross a fork: one per process
+            path = self.app.config['JOBS_STORE']
+            self.store = SQLiteJobStore(path) if path else None
+            if self.store is not None:
+                for job in self.store.load():
+                    if job.key in self._pending:
+                        self.store.remove(job)
+                    else:
+                        self._push(job)
+            self._threads = [
+                threading.Thread(target=self._worker, name=f'jobs-{i}', daemon=True)
+                for i in range(int(self.app.config['JOBS_WORKERS']))
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    # ################################ workers: ################################
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._cond.wait(timeout)
+                _, _, job = heapq.heappop(self._heap)
+                # from here on a new enqueue of the same job queues another run
+                del self._pending[job.key]
+                self._running += 1
+            try:
+                self._execute(job)
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+    def _execute(self, job):
+        fn, _ = self.tasks[job.name]
+        started = time.time()
+        try:
+            with self.app.app_context():
+                fn(*job.args)
+        except Exception:
+            self._failed(job)
+        else:
+            if job.store_id is not None:
+                self.store.remove(job)
+            with self._cond:
+                self._counters['completed'] += 1
+                self._waits.append(started - job.enqueued_at)
+                self._durations.append(time.time() - started)
+
+    def _failed(self, job):
+        config = self.app.config
+        job.attempts += 1
+        if job.attempts >= config['JOBS_MAX_ATTEMPTS']:
+            logger.exception("job %s%r failed after %d attempts", job.name, job.args, job.attempts)
+            if job.store_id is not None:
+                self.store.remove(job)
+            with self._cond:
+                self._counters['failed'] += 1
+            return
+
+        delay = config['JOBS_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+        logger.warning("job %s%r failed (attempt %d), retrying in %.1fs",
+                       job.name, job.args, job.attempts, delay, exc_info=True)
+        job.run_at = time.time() + delay
+        with self._cond:
+            self._counters['retried'] += 1
+            if job.key in self._pending:
+                # queued again meanwhile: that run replaces the retry
+                if job.store_id is not None:
+                    self.store.remove(job)
+                return
+            if job.store_id is not None:
+                self.store.update(job)
+            self._push(job)
+
+    # ################################ stats: ################################
+
+    def stats(self):
+        def summary(values):
+            values = sorted(values)
+            if not values:
+                return {'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+            return {
+                'p50_ms': round(values[len(values) // 2] * 1000, 1),
+                'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+            }
+
+        with self._cond:
+            stats = dict(self._counters)
+            stats['depth'] = len(self._heap)
+            stats['running'] = self._running
+            stats['oldest_wait_s'] = round(time.time() - min(job.enqueued_at for _, _, job in self._heap), 1) if self._heap else 0
+            waits, durations = list(self._waits), list(self._durations)
+        stats['persistent'] = bool(self.app.config['JOBS_STORE'])
+        stats['wait'] = summary(waits)
+        stats['duration'] = summary(durations)
+        return stats
+
+
+jobs = JobQueue()
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Request metrics in Prometheus text format (/metrics).
+#
+# Per endpoint latency histograms, request counters and the number and time
+# of SQL statements (through engine events, so the reader engine counts too).
+# Every response also gets a Server-Timing header with db/render/total.
+# Nothing is registered when METRICS_ENABLED is off, so the cost is zero.
+# /metrics is not protected: keep it behind the proxy or the private network.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.total}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.total}'
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(Histogram)       # (endpoint, method)
+        self.db_latency = defaultdict(Histogram)    # endpoint
+        self.requests = defaultdict(int)            # (endpoint, method, status)
+        self.queries = defaultdict(int)             # endpoint
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+        self.app = app
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.add_url_rule('/metrics', 'metrics', self.export)
+
+    # ################################ request hooks: ################################
+
+    def _before_request(self):
+        g._metrics = {'start': time.perf_counter(), 'db': 0.0, 'queries': 0, 'render': 0.0}
+
+    def _before_render(self, sender, template, context, **extra):
+        if '_metrics' in g:
+            g._metrics['render_start'] = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        state = g.get('_metrics')
+        if state and 'render_start' in state:
+            state['render'] += time.perf_counter() - state.pop('render_start')
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and '_metrics' in g:
+            conn.info.setdefault('_metrics_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_metrics_start')
+        if starts and has_request_context() and '_metrics' in g:
+            g._metrics['db'] += time.perf_counter() - starts.pop()
+            g._metrics['queries'] += 1
+
+    def _after_request(self, response):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return response
+        total = time.perf_counter() - state['start']
+        endpoint = request.endpoint or 'unmatched'
+        with self._lock:
+            self.latency[(endpoint, request.method)].observe(total)
+            self.db_latency[endpoint].observe(state['db'])
+            self.requests[(endpoint, request.method, response.status_code)] += 1
+            self.queries[endpoint] += state['queries']
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={state["db"] * 1000:.2f};desc="{state["queries"]} queries", '
+            f'render;dur={state["render"] * 1000:.2f}, total;dur={total * 1000:.2f}'
+        )
+        return response
+
+    # ################################ export: ################################
+
+    def render(self):
+        with self._lock:
+            latency = {k: (list(h.counts), h.total, h.sum) for k, h in self.latency.items()}
+            db_latency = {k: (list(h.counts), h.total, h.sum) for k, h in self.db_latency.items()}
+            requests = dict(self.requests)
+            queries = dict(self.queries)
+
+        def histogram(name, data, labels):
+            h = Histogram()
+            h.counts, h.total, h.sum = data
+            return h.lines(name, labels)
+
+        lines = [
+            '# HELP flask_request_duration_seconds Request latency per endpoint.',
+            '# TYPE flask_request_duration_seconds histogram',
+        ]
+        for (endpoint, method), data in sorted(latency.items()):
+            lines += histogram('flask_request_duration_seconds', data,
+                               f'endpoint="{_label(endpoint)}",method="{method}"')
+        lines += [
+            '# HELP flask_requests_total Requests per endpoint and status.',
+            '# TYPE flask_requests_total counter',
+        ]
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append(f'flask_requests_total{{endpoint="{_label(endpoint)}",method="{method}",status="{status}"}} {count}')
+        lines += [
+            '# HELP flask_request_db_seconds Time spent in SQL per request.',
+            '# TYPE flask_request_db_seconds histogram',
+        ]
+        for endpoint, data in sorted(db_latency.items()):
+            lines += histogram('flask_request_db_seconds', data, f'endpoint="{_label(endpoint)}"')
+        lines += [
+            '# HELP flask_db_queries_total SQL statements per endpoint.',
+            '# TYPE flask_db_queries_total counter',
+        ]
+        for endpoint, count in sorted(queries.items()):
+            lines.append(f'flask_db_queries_total{{endpoint="{_label(endpoint)}"}} {count}')
+
+        page_cache = self.app.extensions.get('page_cache') if self.app else None
+        if page_cache is not None:
+            stats = page_cache.stats()
+            lines += [
+                '# HELP page_cache_lookups_total Page cache lookups by result.',
+                '# TYPE page_cache_lookups_total counter',
+            ]
+            for result in ('hits', 'misses', 'bypass'):
+                lines.append(f'page_cache_lookups_total{{result="{result}"}} {stats[result]}')
+            lines += [
+                '# TYPE page_cache_invalidations_total counter',
+                f'page_cache_invalidations_total {stats["invalidations"]}',
+            ]
+
+        jobs = self.app.extensions.get('jobs') if self.app else None
+        if jobs is not None:
+            stats = jobs.stats()
+            lines += [
+                '# HELP jobs_queue_depth Background jobs waiting to run.',
+                '# TYPE jobs_queue_depth gauge',
+                f'jobs_queue_depth {stats["depth"]}',
+                '# TYPE jobs_running gauge',
+                f'jobs_running {stats["running"]}',
+                '# HELP jobs_total Background jobs by outcome.',
+                '# TYPE jobs_total counter',
+            ]
+            for outcome in ('enqueued', 'coalesced', 'inline', 'completed', 'retried', 'failed'):
+                lines.append(f'jobs_total{{outcome="{outcome}"}} {stats[outcome]}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -0,0 +1,27 @@
+"""article full text search (fts5)
+
+Revision ID: 8a4e2d61c5f3
+Revises: 3f1c9a7d2b10
+Create Date: 2026-10-18 10:02:17.553901
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import drop_index, rebuild_index
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e2d61c5f3'
+down_revision = '3f1c9a7d2b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # virtual table + triggers can't be autogenerated, see search.py
+    rebuild_index(op.get_bind())
+
+
+def downgrade():
+    drop_index(op.get_bind())
@@ -1,9 +1,14 @@
+from flask import current_app
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from hashing import hasher
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from search import register_ddl
+from routing import RoutingSession
+from renderers import render
 
-db = SQLAlchemy()
+# RoutingSession sends the queries of @read_only views to the reader engine (see routing.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # creating Models
 class Article(db.Model):
@@ -11,9 +16,39 @@ class Article(db.Model):
     title = db.Column(db.String(500), nullable=False, unique=True)
     slug = db.Column(db.String(500))
     extrait = db.Column(db.Text, nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    # the body can be huge and only the detail page needs it: load it on access
+    content = db.deferred(db.Column(db.Text, nullable=False))
+    # content rendered to html at write time, and the renderer that made it ("text:1")
+    content_html = db.deferred(db.Column(db.Text))
+    content_renderer = db.Column(db.String(50))
     category = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # bumped on every edit, used for the ETag / Last-Modified validators
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # composite index used by the keyset pagination of the articles listing
+    __table_args__ = (
+        db.Index('ix_article_created_at_id', 'created_at', 'id'),
+        # the listing filtered by category (?category=), same order
+        db.Index('ix_article_category_created_at', 'category', 'created_at'),
+    )
+
+    def render_content(self, renderer=None):
+        # renderer from the config (ARTICLE_RENDERER) unless given, see renderers.py
+        renderer = renderer or current_app.config['ARTICLE_RENDERER']
+        self.content_html, self.content_renderer = render(self.content, renderer)
+
+
+# full text index (article_fts) + sync triggers, see search.py
+register_ddl(Article.__table__)
+
+
+# number of articles per category, kept up to date by the article write
+# paths (see categories.py) so the listing sidebar doesn't GROUP BY
+class CategoryCount(db.Model):
+    __tablename__ = 'category_count'
+    category = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
 
 
 class User(db.Model, UserMixin):
@@ -23,6 +58,13 @@ class User(db.Model, UserMixin):
     password_hash = db.Column(db.String(256), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # keyset pagination of the admin user list; the username prefix search
+    # uses the unique index on username
+    __table_args__ = (
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+    )
+
     # raising this attribute error to prevent exposing the textplain password
     @property
     def password(self):
@@ -30,9 +72,13 @@ class User(db.Model, UserMixin):
     # set a pasword hasher
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # hashed in the bounded hashing pool, may raise HasherBusy (see hashing.py)
+        self.password_hash = hasher.hash(password)
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+    # the stored hash was made with an older method/cost than the configured one
+    def needs_rehash(self):
+        return hasher.needs_rehash(self.password_hash)
     # create a string
     def __repr__(self):
         return '<Username %r>' % self.username
@@ -0,0 +1,313 @@
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, make_response, request, session
+from flask_login import current_user
+
+
+# Rendered page cache for the public pages.
+#
+# Entries are keyed on a namespace ("articles", "article:12"...), the
+# authentication state (templates show edit buttons to logged in users) and
+# the query parameters the view reads (any other parameter bypasses the
+# cache, so junk query strings cannot fill it). Each namespace has a generation token
+# that is part of the key: invalidating a namespace only replaces its token,
+# every old entry becomes unreachable and ages out of the backend.
+#
+# Under @conditional the key also holds the ETag computed from the data:
+# the memory backend is per worker and invalidate() only reaches the
+# worker that handled the write, so without it another worker would keep
+# serving its old body under the new validator until the TTL.
+#
+# Both backends are bounded by PAGE_CACHE_MAX_ENTRIES and
+# PAGE_CACHE_MAX_BYTES; the filesystem one sweeps its directory of expired
+# and excess files every hundred writes.
+
+
+# ################################ backends: ################################
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+def _size(value):
+    # bytes held by an entry: the page bodies, the rest is small
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_size(v) for v in value)
+    return 0
+
+
+class LRUBackend:
+    """In-process cache bounded by entry count and total size, entries expire after `ttl`."""
+
+    def __init__(self, max_entries=1024, ttl=300, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value, size = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        size = _size(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (expires, value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+
+class FileSystemBackend:
+    """One file per entry in `directory`, shared by every worker on the host.
+
+    Writes go to a temporary file renamed over the entry, so readers in other
+    processes never see a partial file. Each file starts with its expiry time;
+    every `sweep_every` writes the directory is swept: expired entries and
+    stale temporary files are removed, then the oldest entries until it holds
+    at most `max_entries` files and `max_bytes` bytes.
+    """
+
+    HEADER = struct.Struct('>d')  # expiry (time.time()), 0 = never
+
+    def __init__(self, directory, ttl=300, max_entries=10000, max_bytes=None, sweep_every=100):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                expires, = self.HEADER.unpack(f.read(self.HEADER.size))
+                if expires and expires < time.time():
+                    value = None
+                else:
+                    value = pickle.load(f)
+        except (OSError, EOFError, struct.error, pickle.UnpicklingError):
+            return None
+        if value is None:
+            self.delete(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else 0
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.HEADER.pack(expires))
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self.sweep_every == 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Remove the expired entries, then the oldest ones above the bounds."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+                if entry.name.startswith('.tmp'):
+                    # left by a crashed write
+                    if stat.st_mtime < now - 60:
+                        os.unlink(entry.path)
+                    continue
+                with open(entry.path, 'rb') as f:
+                    expires, = self.HEADER.unpack(f.read(self.HEADER.size))
+                if expires and expires < now:
+                    os.unlink(entry.path)
+                    continue
+            except (OSError, struct.error):
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for count, (_, size, path) in zip(range(len(entries), 0, -1), entries):
+            if count <= self.max_entries and (not self.max_bytes or total <= self.max_bytes):
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+# ################################ page cache: ################################
+
+
+class PageCache:
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self._counters = {'hits': 0, 'misses': 0, 'bypass': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_BACKEND', 'memory')
+        app.config.setdefault('PAGE_CACHE_TTL', 300)
+        app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', 1024)
+        # bodies of per_page=100 listings weigh ~180KB each: bound the bytes too
+        app.config.setdefault('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        app.config.setdefault('PAGE_CACHE_DIR', os.path.join(app.instance_path, 'page_cache'))
+
+        kind = app.config['PAGE_CACHE_BACKEND']
+        ttl = int(app.config['PAGE_CACHE_TTL'])
+        max_entries = int(app.config['PAGE_CACHE_MAX_ENTRIES'])
+        max_bytes = int(app.config['PAGE_CACHE_MAX_BYTES'])
+        if kind == 'memory':
+            self.backend = LRUBackend(max_entries, ttl, max_bytes)
+        elif kind == 'filesystem':
+            self.backend = FileSystemBackend(app.config['PAGE_CACHE_DIR'], ttl, max_entries, max_bytes)
+        elif kind in ('null', None, ''):
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown PAGE_CACHE_BACKEND: {kind!r}")
+        app.extensions['page_cache'] = self
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['backend'] = type(self.backend).__name__
+        return stats
+
+    def _generation(self, namespace):
+        key = f"gen:{namespace}"
+        token = self.backend.get(key)
+        if token is None:
+            # never set, expired or evicted: a fresh token can't match any old entry
+            token = uuid.uuid4().hex
+            self.backend.set(key, token, ttl=0)
+        return token
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.set(f"gen:{namespace}", uuid.uuid4().hex, ttl=0)
+            self._count('invalidations')
+
+    def clear(self):
+        self.backend.clear()
+
+    def cached(self, namespace, query_args=()):
+        """Cache the rendered page of a GET view.
+
+        `namespace` is a string or a function of the view arguments, e.g.
+        ``lambda id: f"article:{id}"``; pass the same name to `invalidate`.
+        `query_args` are the query parameters the view reads, the only ones in the
+        key: a request with any other one is not cached.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                # pending flash messages are rendered in the page, never cache those
+                if request.method != 'GET' or session.get('_flashes') or not set(request.args) <= set(query_args):
+                    self._count('bypass')
+                    return f(*args, **kwargs)
+
+                name = namespace(**kwargs) if callable(namespace) else namespace
+                variant = 'auth' if current_user.is_authenticated else 'anon'
+                params = [(arg, request.args.get(arg)) for arg in query_args if arg in request.args]
+                key = f"page:{name}:{self._generation(name)}:{g.get('etag', '')}:{variant}:{params!r}"
+
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self._count('hits')
+                    body, mimetype = entry
+                    response = make_response(body)
+                    response.mimetype = mimetype
+                    return response
+
+                self._count('misses')
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, (response.get_data(), response.mimetype))
+                return response
+            return decorated_function
+        return decorator
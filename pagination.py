@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+# Keyset ("cursor") pagination:
+# instead of OFFSET, every page starts right after (or right before) the last
+# row the reader has seen, so the database jumps straight to it through the
+# index and a page costs the same on row 10 or on row 1 000 000.
+
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+# sqlite INTEGER: a larger python int fails when bound, not when decoded
+MIN_INT, MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    # datetimes are not json serializable, keep them as iso strings
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, types):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(raw) != len(types):
+            raise InvalidCursor(cursor)
+        values = tuple(
+            datetime.fromisoformat(v) if t is datetime and v is not None else t(v)
+            for v, t in zip(raw, types)
+        )
+        if any(isinstance(v, int) and not MIN_INT <= v <= MAX_INT for v in values):
+            raise InvalidCursor(cursor)
+        return values
+    except (ValueError, TypeError, OverflowError):
+        raise InvalidCursor(cursor)
+
+
+def page_size(value, default=DEFAULT_PER_PAGE, maximum=MAX_PER_PAGE):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(value, maximum))
+
+
+def keyset_select(stmt, columns, per_page, after=None, before=None):
+    """Restrict `stmt` to the page following `after` (or preceding `before`).
+
+    `columns` is the ordering key, e.g. (Article.created_at, Article.id); it
+    must be unique and covered by an index. One extra row is fetched so we
+    know if there is another page without running a COUNT.
+    """
+    key = tuple_(*columns)
+    if before is not None:
+        stmt = stmt.where(key < tuple_(*before)).order_by(*[c.desc() for c in columns])
+    else:
+        if after is not None:
+            stmt = stmt.where(key > tuple_(*after))
+        stmt = stmt.order_by(*columns)
+    return stmt.limit(per_page + 1)
+
+
+class KeysetPage:
+    """One page of rows fetched with `keyset_select`."""
+
+    def __init__(self, rows, key, per_page, after=None, before=None):
+        rows = list(rows)
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if before is not None:
+            # rows were fetched backwards
+            rows.reverse()
+            self.has_prev = has_more
+            self.has_next = True
+        else:
+            self.has_prev = after is not None
+            self.has_next = has_more
+        self.items = rows
+        self.per_page = per_page
+        self._key = key
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.items:
+            return encode_cursor(self._key(self.items[-1]))
+        return None
+
+    @property
+    def prev_cursor(self):
+        if self.has_prev and self.items:
+            return encode_cursor(self._key(self.items[0]))
+        return None
@@ -0,0 +1,120 @@
+import logging
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Development / CI query checks (QUERY_DEBUG=1):
+#   - statements slower than SLOW_QUERY_MS are logged with their
+#     EXPLAIN QUERY PLAN;
+#   - requests running the same statement QUERY_REPEAT_THRESHOLD times or
+#     more (identical, or same SQL with other parameters: the N+1 pattern)
+#     are logged;
+#   - views declare a query budget with @query_budget(n); going over it is
+#     logged, and raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is on
+#     (the default under app.testing) so the test fails.
+
+logger = logging.getLogger('querylog')
+
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may run."""
+    def decorator(f):
+        f.query_budget = max_queries
+        return f
+    return decorator
+
+
+class QueryLog:
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_DEBUG', False)
+        app.config.setdefault('SLOW_QUERY_MS', 100)
+        app.config.setdefault('QUERY_REPEAT_THRESHOLD', 3)
+        app.config.setdefault('QUERY_BUDGET_STRICT', None)
+        app.extensions['querylog'] = self
+        if not app.config['QUERY_DEBUG']:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_request(self):
+        g._querylog = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and '_querylog' in g:
+            conn.info.setdefault('_querylog_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_querylog_start')
+        if not starts or not has_request_context() or '_querylog' not in g:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        g._querylog.append((statement, repr(parameters), elapsed))
+
+        if elapsed * 1000 >= current_app.config['SLOW_QUERY_MS']:
+            plan = ''
+            if not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+                plan = self._explain(conn, statement, parameters)
+            logger.warning("slow query (%.1f ms) in %s:\n%s\n%s\n%s",
+                           elapsed * 1000, request.endpoint, statement, parameters, plan)
+
+    def _explain(self, conn, statement, parameters):
+        if conn.dialect.name != 'sqlite':
+            return ''
+        # raw dbapi cursor: doesn't go through the engine events again
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return '\n'.join(f"  {row[-1]}" for row in cursor.fetchall())
+        except Exception as e:
+            return f"  (no plan: {e})"
+        finally:
+            cursor.close()
+
+    def _after_request(self, response):
+        queries = g.pop('_querylog', None)
+        if queries is None:
+            return response
+        config = current_app.config
+        threshold = config['QUERY_REPEAT_THRESHOLD']
+
+        identical = Counter((statement, params) for statement, params, _ in queries)
+        for (statement, params), count in identical.items():
+            if count >= threshold:
+                logger.warning("%s ran the same query %d times:\n%s\n%s",
+                               request.endpoint, count, statement, params)
+        similar = Counter(statement for statement, _, _ in queries)
+        for statement, count in similar.items():
+            distinct = sum(1 for (s, _) in identical if s == statement)
+            if count >= threshold and distinct > 1:
+                logger.warning("%s ran %d near-identical queries (possible N+1):\n%s",
+                               request.endpoint, count, statement)
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and len(queries) > budget:
+            message = f"{request.endpoint} ran {len(queries)} queries, its budget is {budget}"
+            logger.error(message)
+            strict = config['QUERY_BUDGET_STRICT']
+            if strict or (strict is None and current_app.testing):
+                raise QueryBudgetExceeded(message)
+        return response
+
+
+querylog = QueryLog()
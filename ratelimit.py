@@ -0,0 +1,174 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Sliding window rate limiting (login attempts).
+#
+# Each key ("ip:1.2.3.4", "user:admin") keeps three numbers: the start of the
+# current fixed window, the hits in it and the hits in the previous one. The
+# rate over the last `window` seconds is estimated by weighting the previous
+# window by the part of it still inside the sliding window, which is smooth
+# at window edges without storing every timestamp.
+#
+# The memory store is an LRU bounded to RATE_LIMIT_MAX_KEYS keys, per
+# process. RATE_LIMIT_STORE=<path> keeps the counters in a SQLite file
+# instead, shared by the gunicorn workers of a host, and pruned back to
+# RATE_LIMIT_MAX_KEYS every 1000 hits.
+# Rejected requests are not counted: a client that waits Retry-After gets in.
+
+
+def parse_rule(rule):
+    """"5/60" -> (5, 60.0): at most 5 hits per 60 seconds."""
+    limit, window = str(rule).split('/')
+    return int(limit), float(window)
+
+
+def _slide(state, now, window):
+    # move (start, current, previous) to the window containing `now`
+    start, current, previous = state
+    elapsed = now - start
+    if elapsed >= 2 * window:
+        return [now - (elapsed % window), 0, 0]
+    if elapsed >= window:
+        return [start + window, 0, current]
+    return state
+
+
+def _estimate(state, now, window):
+    start, current, previous = state
+    return previous * (1 - (now - start) / window) + current
+
+
+def _retry_after(state, now, limit, window):
+    # seconds until one more hit fits under the limit
+    start, current, previous = state
+    elapsed = now - start
+    if current < limit and previous:
+        # within this window, as the previous one fades out
+        wait = window * (1 - (limit - 1 - current) / previous) - elapsed
+        if wait <= window - elapsed:
+            return max(wait, 0)
+    # next window: this one becomes the previous
+    wait = window - elapsed
+    if current:
+        wait += max(window * (1 - (limit - 1) / current), 0)
+    return wait
+
+
+class MemoryStore:
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+
+    def hit(self, checks, now):
+        with self._lock:
+            states = []
+            for key, limit, window in checks:
+                state = self._states.get(key)
+                state = _slide(state, now, window) if state is not None else [now, 0, 0]
+                states.append(state)
+                if _estimate(state, now, window) + 1 > limit:
+                    return _retry_after(state, now, limit, window)
+            for (key, limit, window), state in zip(checks, states):
+                state[1] += 1
+                self._states[key] = state
+                self._states.move_to_end(key)
+            while len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+
+class SQLiteStore:
+
+    def __init__(self, path, max_keys=100000):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._hits = 0
+
+    def _connection(self):
+        # one connection per thread and process
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                " key TEXT PRIMARY KEY, start REAL NOT NULL, current INTEGER NOT NULL, previous INTEGER NOT NULL)"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def hit(self, checks, now):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            states = []
+            for key, limit, window in checks:
+                row = conn.execute("SELECT start, current, previous FROM rate_limit WHERE key = ?", (key,)).fetchone()
+                state = _slide(list(row), now, window) if row is not None else [now, 0, 0]
+                states.append(state)
+                if _estimate(state, now, window) + 1 > limit:
+                    conn.execute("ROLLBACK")
+                    return _retry_after(state, now, limit, window)
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_limit (key, start, current, previous) VALUES (?, ?, ?, ?)",
+                [(key, state[0], state[1] + 1, state[2]) for (key, _, _), state in zip(checks, states)])
+            self._hits += 1
+            if self._hits % 1000 == 0:
+                # bounded size: drop the least recently started windows
+                conn.execute(
+                    "DELETE FROM rate_limit WHERE key IN (SELECT key FROM rate_limit ORDER BY start DESC LIMIT -1 OFFSET ?)",
+                    (self.max_keys,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return None
+
+    def clear(self):
+        self._connection().execute("DELETE FROM rate_limit")
+
+
+class RateLimiter:
+
+    def __init__(self, app=None):
+        self.store = None
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('RATE_LIMIT_STORE', None)
+        app.config.setdefault('RATE_LIMIT_MAX_KEYS', 100000)
+        max_keys = int(app.config['RATE_LIMIT_MAX_KEYS'])
+        path = app.config['RATE_LIMIT_STORE']
+        self.store = SQLiteStore(path, max_keys) if path else MemoryStore(max_keys)
+        self.app = app
+        app.extensions['rate_limiter'] = self
+
+    def hit(self, *checks):
+        """Count one hit for every (key, rule) of `checks`, or none when one is over its limit.
+
+        Returns None when allowed, else the seconds to wait (Retry-After).
+        """
+        if not self.app.config['RATE_LIMIT_ENABLED']:
+            return None
+        checks = [(key, *parse_rule(rule)) for key, rule in checks if key is not None]
+        retry_after = self.store.hit(checks, time.time())
+        return None if retry_after is None else max(1, math.ceil(retry_after))
+
+
+limiter = RateLimiter()
@@ -0,0 +1,96 @@
+import html
+import re
+from urllib.parse import urlsplit
+
+from markupsafe import escape
+
+
+# Article body renderers.
+#
+# The body is rendered to HTML once, when it is saved, and stored with the
+# renderer name and version in Article.content_renderer ("markdown:1").
+# Bump a renderer's version when its output changes, then run
+# `flask articles rerender` to rebuild only the rows made by older versions.
+
+RENDERERS = {}
+
+
+def register(name, version):
+    def decorator(fn):
+        RENDERERS[name] = (version, fn)
+        return fn
+    return decorator
+
+
+def renderer_version(name):
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown article renderer: {name!r}")
+    version, _ = RENDERERS[name]
+    return f"{name}:{version}"
+
+
+def render(source, name):
+    """Returns (html, version) for `source` with the renderer `name`."""
+    version, fn = RENDERERS[name]
+    return fn(source or ''), f"{name}:{version}"
+
+
+def render_rows(name, rows):
+    # runs in the worker processes of `flask articles rerender`
+    version, fn = RENDERERS[name]
+    return [(id, fn(source or '')) for id, source in rows]
+
+
+# ################################ renderers: ################################
+
+
+@register('text', 1)
+def render_text(source):
+    # blank lines separate paragraphs, single new lines are kept
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', source.replace('\r\n', '\n')) if p.strip()]
+    return '\n'.join(
+        '<p class="fs-5 mb-4">%s</p>' % '<br>\n'.join(str(escape(line)) for line in p.split('\n'))
+        for p in paragraphs
+    )
+
+
+# link targets kept in the markdown output, anything else (javascript:,
+# data:, vbscript:...) is dropped
+SAFE_URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+
+
+def safe_url(url):
+    # browsers decode entities and ignore blanks and control characters in the scheme
+    url = re.sub(r'[\x00-\x20]', '', html.unescape(url or ''))
+    return urlsplit(url).scheme.lower() in SAFE_URL_SCHEMES
+
+
+def _markdown_extensions():
+    from markdown.extensions import Extension
+    from markdown.treeprocessors import Treeprocessor
+
+    class UrlFilter(Treeprocessor):
+        def run(self, root):
+            for element in root.iter():
+                for attribute in ('href', 'src'):
+                    if attribute in element.attrib and not safe_url(element.get(attribute)):
+                        del element.attrib[attribute]
+
+    class SafeMarkdown(Extension):
+        def extendMarkdown(self, md):
+            # no raw html from the authors: tags are written out escaped, as text
+            md.preprocessors.deregister('html_block')
+            md.inlinePatterns.deregister('html')
+            md.treeprocessors.register(UrlFilter(md), 'url_filter', 0)
+
+    # 'extra' without attr_list ({: onclick=...}) and md_in_html
+    return ['abbr', 'def_list', 'fenced_code', 'footnotes', 'tables', 'sane_lists', SafeMarkdown()]
+
+
+@register('markdown', 2)
+def render_markdown(source):
+    try:
+        import markdown
+    except ImportError:
+        raise RuntimeError("The markdown renderer needs the 'markdown' package: pip install markdown")
+    return markdown.markdown(source, extensions=_markdown_extensions(), output_format='html')
@@ -0,0 +1,78 @@
+import sqlite3
+from functools import wraps
+from urllib.parse import quote
+
+from flask import current_app, g
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+import db_profile
+
+
+# Read/write routing.
+#
+# Views decorated with @read_only run their queries on a separate reader
+# engine; everything else (and any flush, even inside a read only view) uses
+# the normal writer engine. With SQLite the reader opens the same file with
+# mode=ro, so public pages never take the writer's lock. Set
+# SQLALCHEMY_READER_URI to point the reader at a real replica instead.
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and g and g.get('_db_read_only'):
+            router = current_app.extensions.get('db_router')
+            if router is not None and router.reader is not None:
+                return router.reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(f):
+    """Route the queries of this view to the reader engine."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        previous = g.get('_db_read_only', False)
+        g._db_read_only = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g._db_read_only = previous
+    return decorated_function
+
+
+def _sqlite_reader(path, options):
+    uri = f"file:{quote(path)}?mode=ro"
+
+    def connect():
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+    return create_engine('sqlite://', creator=connect, poolclass=QueuePool, **options)
+
+
+class ReadRouter:
+
+    def __init__(self, app=None, db=None):
+        self.reader = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('SQLALCHEMY_READER_URI', None)
+        app.config.setdefault('DB_READ_ROUTING', True)
+        app.extensions['db_router'] = self
+        if not app.config['DB_READ_ROUTING']:
+            return
+
+        options = {k: v for k, v in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items()
+                   if k in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')}
+        if app.config['SQLALCHEMY_READER_URI']:
+            self.reader = create_engine(app.config['SQLALCHEMY_READER_URI'], **options)
+        else:
+            with app.app_context():
+                writer = db.engine
+            # an in memory database can't be shared with a second engine
+            if writer.dialect.name != 'sqlite' or writer.url.database in (None, '', ':memory:'):
+                return
+            self.reader = _sqlite_reader(writer.url.database, options)
+        db_profile.apply_pragmas(self.reader, db_profile.pragmas_for(app.config), read_only=True)
@@ -0,0 +1,138 @@
+from markupsafe import Markup, escape
+from sqlalchemy import DateTime, event, text
+from sqlalchemy.exc import OperationalError
+
+
+# Full text search over articles with SQLite FTS5.
+# `article_fts` is an external content table: it only stores the index and
+# reads the columns back from `article`. The triggers below keep it in sync
+# with every insert/update/delete, whatever code path writes the row.
+
+FTS_TABLE = 'article_fts'
+
+CREATE_STATEMENTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(
+        title, extrait, content,
+        content='article', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_ai AFTER INSERT ON article BEGIN
+        INSERT INTO article_fts(rowid, title, extrait, content)
+        VALUES (new.id, new.title, new.extrait, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_ad AFTER DELETE ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, extrait, content)
+        VALUES ('delete', old.id, old.title, old.extrait, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_au AFTER UPDATE OF title, extrait, content ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, extrait, content)
+        VALUES ('delete', old.id, old.title, old.extrait, old.content);
+        INSERT INTO article_fts(rowid, title, extrait, content)
+        VALUES (new.id, new.title, new.extrait, new.content);
+    END""",
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS article_fts_au",
+    "DROP TRIGGER IF EXISTS article_fts_ad",
+    "DROP TRIGGER IF EXISTS article_fts_ai",
+    "DROP TABLE IF EXISTS article_fts",
+]
+
+# bm25 weights for title, extrait, content: a hit in the title ranks higher
+RANK = "bm25(article_fts, 10.0, 4.0, 1.0)"
+
+# control characters used as highlight markers, so the snippet can be
+# html escaped before the <mark> tags are put in
+_START, _END = '\x02', '\x03'
+
+
+def create_index(connection):
+    for statement in CREATE_STATEMENTS:
+        connection.execute(text(statement))
+
+
+def drop_index(connection):
+    for statement in DROP_STATEMENTS:
+        connection.execute(text(statement))
+
+
+def rebuild_index(connection):
+    """(Re)create the FTS table and triggers and reindex every article."""
+    create_index(connection)
+    connection.execute(text("INSERT INTO article_fts(article_fts) VALUES ('rebuild')"))
+    return connection.execute(text("SELECT count(*) FROM article")).scalar()
+
+
+def merge_index(connection, pages=500):
+    """Merge the small b-trees left by many single row updates (bounded work)."""
+    connection.execute(text("INSERT INTO article_fts(article_fts, rank) VALUES ('merge', :pages)"), {'pages': pages})
+
+
+def fts_query(terms):
+    # quote every word so user input can't be parsed as FTS5 syntax
+    # ("AND", "NEAR", "col:", unbalanced quotes...), last word is a prefix
+    words = [w.replace('"', '""') for w in terms.split()]
+    if not words:
+        return None
+    quoted = ['"%s"' % w for w in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_START, '<mark>').replace(_END, '</mark>'))
+
+
+def search_articles(session, terms, page=1, per_page=10):
+    """Ranked search. Returns (rows, has_next); rows have id, title, created_at,
+    category and an html safe `snippet`."""
+    query = fts_query(terms)
+    if query is None:
+        return [], False
+    stmt = text(f"""
+        SELECT a.id, a.title, a.category, a.created_at,
+               snippet(article_fts, -1, :start, :end, '…', 16) AS snippet
+        FROM article_fts
+        JOIN article a ON a.id = article_fts.rowid
+        WHERE article_fts MATCH :query
+        ORDER BY {RANK}
+        LIMIT :limit OFFSET :offset
+    """).columns(created_at=DateTime)
+    try:
+        rows = session.execute(stmt, {
+            'query': query,
+            'start': _START,
+            'end': _END,
+            'limit': per_page + 1,
+            'offset': (page - 1) * per_page,
+        }).all()
+    except OperationalError:
+        # the index does not exist yet (run `flask search rebuild`)
+        session.rollback()
+        return [], False
+    results = [
+        {
+            'id': row.id,
+            'title': row.title,
+            'category': row.category,
+            'created_at': row.created_at,
+            'snippet': highlight(row.snippet),
+        }
+        for row in rows[:per_page]
+    ]
+    return results, len(rows) > per_page
+
+
+def _create_with_table(target, connection, **kw):
+    create_index(connection)
+
+
+def _drop_with_table(target, connection, **kw):
+    drop_index(connection)
+
+
+def register_ddl(table):
+    # databases built with db.create_all() (dev, tests) get the index too
+    event.listen(table, 'after_create', _create_with_table)
+    event.listen(table, 'before_drop', _drop_with_table)
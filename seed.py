@@ -0,0 +1,108 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+import categories
+import search
+from blog_forms import CATEGORIES
+from renderers import render
+from hashing import hasher
+from models import Article, User
+
+
+# Synthetic data for development and benchmarks (flask seed).
+# Rows go in with executemany inserts, one transaction per chunk; the full
+# text triggers are dropped during the load and the index rebuilt once at
+# the end, which is much faster than indexing row by row. The category
+# counts are recomputed once at the end as well.
+
+WORDS = (
+    "conduite permis voiture route vitesse feu rouge priorite rond point autoroute "
+    "examen code moniteur ecole stationnement pneu frein moteur accident assurance "
+    "radar amende ceinture securite pieton cycliste camion nuit pluie brouillard "
+    "virage depassement carrefour signalisation panneau vehicule entretien huile"
+).split()
+
+BASE_DATE = datetime(2020, 1, 1)
+
+
+def sentence(rng, n):
+    return " ".join(rng.choices(WORDS, k=n))
+
+
+def synthetic_articles(n, content_words=300, seed=42, start=0, renderer='text'):
+    rng = random.Random(seed + start)
+    for i in range(start, start + n):
+        created_at = BASE_DATE + timedelta(minutes=i)
+        content = sentence(rng, content_words)
+        content_html, content_renderer = render(content, renderer)
+        yield {
+            'title': f"{sentence(rng, 5)} #{i}",
+            'slug': f"article-{i}",
+            'extrait': sentence(rng, 30),
+            'content': content,
+            'content_html': content_html,
+            'content_renderer': content_renderer,
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+
+def synthetic_users(n, password_hash, start=0):
+    for i in range(start, start + n):
+        yield {
+            'username': f"user{i}",
+            'full_name': f"Utilisateur {i}",
+            'password_hash': password_hash,
+            'is_admin': False,
+            'created_at': BASE_DATE + timedelta(minutes=i),
+        }
+
+
+def chunks(rows, size):
+    while True:
+        batch = [row for _, row in zip(range(size), rows)]
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(engine, table, rows, chunk=10000):
+    count = 0
+    for batch in chunks(rows, chunk):
+        with engine.begin() as connection:
+            connection.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+def seed(engine, articles=0, users=0, chunk=10000, content_words=300, password='password', renderer='text'):
+    """Append `articles` and `users` synthetic rows, returns timings per table."""
+    report = {}
+    with engine.connect() as connection:
+        # continue numbering after a previous run so titles/usernames stay unique
+        article_start = connection.execute(select(func.count()).select_from(Article.__table__)).scalar()
+        user_start = connection.execute(select(func.count()).select_from(User.__table__)).scalar()
+
+    if articles:
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            search.drop_index(connection)
+        bulk_insert(engine, Article.__table__,
+                    synthetic_articles(articles, content_words=content_words, start=article_start, renderer=renderer),
+                    chunk)
+        with engine.begin() as connection:
+            search.rebuild_index(connection)
+            categories.rebuild_counts(connection)
+        report['articles'] = (articles, time.perf_counter() - start)
+
+    if users:
+        start = time.perf_counter()
+        # every synthetic user shares the same password: hash it once
+        password_hash = hasher.hash(password)
+        bulk_insert(engine, User.__table__, synthetic_users(users, password_hash, start=user_start), chunk)
+        report['users'] = (users, time.perf_counter() - start)
+    return report
@@ -0,0 +1,67 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+# Compiled templates kept on disk.
+#
+# Jinja compiles a template to python code the first time a process uses
+# it, so every new gunicorn worker pays for base.html, articles.html...
+# on its first requests. With a FileSystemBytecodeCache in
+# TEMPLATE_CACHE_DIR (instance/jinja by default, "" to disable) the
+# compiled code is written once and loaded by every worker of the host.
+# Entries carry a checksum of the source and the python version, so an
+# edited template is compiled again rather than served stale.
+# `flask templates compile` fills the cache at build time and
+# TEMPLATE_WARMUP=1 loads every template when the app starts, before the
+# first request.
+
+
+class TemplateCache:
+
+    def __init__(self, app=None):
+        self.cache = None
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja'))
+        app.config.setdefault('TEMPLATE_WARMUP', False)
+        directory = app.config['TEMPLATE_CACHE_DIR']
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.cache = FileSystemBytecodeCache(directory)
+            # read when app.jinja_env is created, on its first use
+            app.jinja_options = {**app.jinja_options, 'bytecode_cache': self.cache}
+        self.app = app
+        app.extensions['template_cache'] = self
+
+    def names(self):
+        return sorted(self.app.jinja_env.list_templates())
+
+    def load_all(self):
+        """Load every template into this process, returns their names."""
+        env = self.app.jinja_env
+        names = self.names()
+        for name in names:
+            env.get_template(name)
+        return names
+
+    def compile(self, clean=False):
+        """Write the bytecode of every template, returns their names."""
+        if self.cache is None:
+            raise RuntimeError("TEMPLATE_CACHE_DIR is not set, there is no bytecode cache to fill")
+        if clean:
+            self.cache.clear()
+        # templates already loaded in this process would not be written again
+        if self.app.jinja_env.cache is not None:
+            self.app.jinja_env.cache.clear()
+        return self.load_all()
+
+    def warm_up(self):
+        if self.app.config['TEMPLATE_WARMUP']:
+            self.load_all()
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,121 @@
+import json
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from blog_forms import CATEGORIES
+from categories import adjust_counts
+from models import Article
+from renderers import render
+from seed import chunks
+
+
+# JSONL export / import of the articles (flask articles export / import).
+#
+# One article per line. Export streams the rows with yield_per, import
+# validates each line, drops titles already in the database (one IN query
+# per chunk) or repeated in the chunk, renders content_html and inserts the
+# chunk with one executemany in its own transaction, category counts included.
+
+FIELDS = ('title', 'slug', 'extrait', 'content', 'category', 'created_at', 'updated_at')
+REQUIRED = ('title', 'extrait', 'content', 'category')
+MAX_LENGTHS = {'title': 500, 'slug': 500, 'category': 200}
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def export_articles(session, out, batch=1000):
+    """Write every article as a JSON line to `out`, returns the count."""
+    columns = [getattr(Article, name) for name in FIELDS]
+    stmt = select(*columns).order_by(Article.id).execution_options(yield_per=batch)
+    count = 0
+    for row in session.execute(stmt):
+        record = dict(zip(FIELDS, row))
+        for name in ('created_at', 'updated_at'):
+            if record[name] is not None:
+                record[name] = record[name].isoformat()
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def _datetime(record, name):
+    value = record.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidRecord(f"{name}: not an ISO 8601 date: {value!r}")
+
+
+def parse_record(line):
+    """Returns the insert parameters of a JSON line, raises InvalidRecord."""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise InvalidRecord(f"invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise InvalidRecord("not a JSON object")
+    for name in REQUIRED:
+        value = record.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise InvalidRecord(f"{name}: missing or empty")
+    if record.get('slug') is not None and not isinstance(record['slug'], str):
+        raise InvalidRecord("slug: not a string")
+    if record['category'] not in CATEGORIES:
+        raise InvalidRecord(f"category: unknown category {record['category']!r}")
+    for name, length in MAX_LENGTHS.items():
+        if record.get(name) and len(record[name]) > length:
+            raise InvalidRecord(f"{name}: longer than {length} characters")
+
+    created_at = _datetime(record, 'created_at') or datetime.utcnow()
+    return {
+        'title': record['title'].strip(),
+        'slug': record.get('slug'),
+        'extrait': record['extrait'],
+        'content': record['content'],
+        'category': record['category'],
+        'created_at': created_at,
+        'updated_at': _datetime(record, 'updated_at') or created_at,
+    }
+
+
+def _records(lines, report):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield parse_record(line)
+        except InvalidRecord as e:
+            report['invalid'] += 1
+            report['errors'].append((number, str(e)))
+
+
+def import_articles(engine, lines, chunk=1000, renderer='text'):
+    """Insert the articles of the JSON `lines`, one transaction per chunk.
+
+    Returns a report: imported / duplicates / invalid counts, and the
+    (line number, message) of the invalid lines.
+    """
+    table = Article.__table__
+    report = {'imported': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+    for batch in chunks(_records(lines, report), chunk):
+        unique = {}
+        for row in batch:
+            unique.setdefault(row['title'], row)
+        with engine.begin() as connection:
+            existing = set(connection.execute(
+                select(table.c.title).where(table.c.title.in_(list(unique)))).scalars())
+            rows = [row for title, row in unique.items() if title not in existing]
+            for row in rows:
+                row['content_html'], row['content_renderer'] = render(row['content'], renderer)
+            if rows:
+                connection.execute(insert(table), rows)
+                adjust_counts(connection, Counter(row['category'] for row in rows))
+        report['imported'] += len(rows)
+        report['duplicates'] += len(batch) - len(rows)
+    return report
@@ -0,0 +1,99 @@
+import threading
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import User, db
+from page_cache import LRUBackend
+
+
+# Per process cache for flask-login's user_loader.
+# Every page checks current_user, so without it each request pays a query on
+# the user table. Entries are read only snapshots (no password hash, not
+# attached to any session) that expire after USER_CACHE_TTL seconds, and are
+# dropped as soon as this process inserts, updates or deletes the user.
+
+
+class UserSnapshot(UserMixin):
+    __slots__ = ('id', 'username', 'full_name', 'is_admin', 'created_at')
+
+    def __init__(self, id, username, full_name, is_admin, created_at):
+        for name, value in zip(self.__slots__, (id, username, full_name, is_admin, created_at)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Cached users are read only, load the User model to change it')
+
+    def __delattr__(self, name):
+        raise AttributeError('Cached users are read only, load the User model to change it')
+
+    def __repr__(self):
+        return '<Username %r>' % self.username
+
+
+class UserCache:
+
+    def __init__(self, app=None):
+        self._users = LRUBackend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_TTL', 30)
+        app.config.setdefault('USER_CACHE_MAX_ENTRIES', 10000)
+        self._users = LRUBackend(int(app.config['USER_CACHE_MAX_ENTRIES']), int(app.config['USER_CACHE_TTL']))
+        app.extensions['user_cache'] = self
+
+    def load(self, user_id):
+        user = self._users.get(user_id)
+        if user is not None:
+            with self._lock:
+                self.hits += 1
+            return user
+        with self._lock:
+            self.misses += 1
+        row = db.session.query(User.id, User.username, User.full_name, User.is_admin, User.created_at) \
+            .filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = UserSnapshot(*row)
+        self._users.set(user_id, user)
+        return user
+
+    def invalidate(self, user_id):
+        self._users.delete(user_id)
+
+    def clear(self):
+        self._users.clear()
+
+
+user_cache = UserCache()
+
+
+# any change to a user row (admin flag, deletion, ...) evicts its snapshot,
+# once committed: evicted at flush time, a concurrent request could load the
+# old committed row again before the commit and cache it for the whole TTL
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        user_cache.invalidate(target.id)
+        return
+    session.info.setdefault('changed_users', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_changed_users(session):
+    for user_id in session.info.pop('changed_users', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_users', None)